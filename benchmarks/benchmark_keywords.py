@@ -0,0 +1,248 @@
+from argparse import ArgumentParser
+import codecs
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+from typing import Dict, List, Union
+
+import artm
+import numpy as np
+import spacy
+from spacy.language import Language
+
+from keyword_extraction.instrumentation import get_current_rss
+from keyword_extraction.keyword_extraction import KeywordExtractor
+from keyword_extraction.tokenization import OilAndGasTextPreprocessr, SpaCyTokenizer
+
+
+keyword_extraction_logger = logging.getLogger(__name__)
+STOP_WORDS = ['the', 'a', 'of', 'in', 'and', 'to', 'is', 'was', 'with', 'for', 'on', 'by', 'at', 'from']
+
+
+def generate_word(random_generator: random.Random) -> str:
+    consonants = 'bcdfghklmnprstvz'
+    vowels = 'aeiou'
+    return ''.join([random_generator.choice(consonants) + random_generator.choice(vowels)
+                    for _ in range(random_generator.randint(2, 4))])
+
+
+def generate_terms(number_of_topics: int, terms_per_topic: int, random_generator: random.Random) -> List[List[str]]:
+    terms = []
+    for _ in range(number_of_topics):
+        terms.append([' '.join([generate_word(random_generator) for _ in range(random_generator.randint(1, 3))])
+                      for _ in range(terms_per_topic)])
+    return terms
+
+
+def generate_corpus(corpus_dir: str, terms: List[List[str]], number_of_files: int, paragraphs_per_file: int,
+                    lines_per_paragraph: int, random_generator: random.Random) -> List[str]:
+    if not os.path.isdir(corpus_dir):
+        os.makedirs(corpus_dir)
+    list_of_files = []
+    for file_idx in range(number_of_files):
+        file_name = os.path.join(corpus_dir, 'text_{0:06}.txt'.format(file_idx))
+        with codecs.open(file_name, mode='w', encoding='utf-8', errors='ignore') as fp:
+            for _ in range(paragraphs_per_file):
+                terms_of_topic = random_generator.choice(terms)
+                for _ in range(lines_per_paragraph):
+                    words = []
+                    while sum(map(len, words)) < 60:
+                        if random_generator.random() < 0.4:
+                            words.append(random_generator.choice(terms_of_topic))
+                        else:
+                            words.append(random_generator.choice(STOP_WORDS))
+                    fp.write(' '.join(words) + '.\n')
+                fp.write('\n')
+        list_of_files.append(file_name)
+    return list_of_files
+
+
+def create_stub_nlp(terms: List[List[str]]) -> Language:
+    spacy_nlp = spacy.blank('en')
+    entity_ruler = spacy_nlp.add_pipe('entity_ruler')
+    entity_ruler.add_patterns([{'label': 'TERM', 'pattern': cur_term}
+                               for terms_of_topic in terms for cur_term in terms_of_topic])
+    return spacy_nlp
+
+
+def get_peak_rss(who: int=resource.RUSAGE_SELF) -> int:
+    peak_rss = resource.getrusage(who).ru_maxrss
+    if sys.platform == 'darwin':
+        return peak_rss
+    return peak_rss * 1024
+
+
+def measure_stage(stage_name: str, start_time: float, start_rss: Union[int, None], n_items: int, item_name: str,
+                  n_bytes: Union[int, None]=None) -> Dict[str, Union[str, int, float, None]]:
+    elapsed_time = max(time.perf_counter() - start_time, 1e-9)
+    end_rss = get_current_rss()
+    result = {'stage': stage_name, 'seconds': elapsed_time, item_name: n_items,
+              item_name + '_per_second': n_items / elapsed_time, 'rss_before_bytes': start_rss,
+              'rss_after_bytes': end_rss,
+              'rss_delta_bytes': None if ((start_rss is None) or (end_rss is None)) else (end_rss - start_rss)}
+    if n_bytes is not None:
+        result['megabytes_per_second'] = n_bytes / (1024.0 * 1024.0) / elapsed_time
+    keyword_extraction_logger.info('Stage `{0}` has taken {1:.3f} seconds.'.format(stage_name, elapsed_time))
+    return result
+
+
+def run_benchmark(args) -> dict:
+    random_generator = random.Random(args.random_seed)
+    terms = generate_terms(args.topics_number, args.terms_per_topic, random_generator)
+    work_dir = tempfile.mkdtemp(prefix='keywords_benchmark_') if args.work_dir is None else args.work_dir
+    if not os.path.isdir(work_dir):
+        os.makedirs(work_dir)
+    stages = []
+
+    start_time = time.perf_counter()
+    start_rss = get_current_rss()
+    list_of_files = generate_corpus(os.path.join(work_dir, 'corpus'), terms, args.files_number,
+                                    args.paragraphs_per_file, args.lines_per_paragraph, random_generator)
+    corpus_size = sum(map(os.path.getsize, list_of_files))
+    stages.append(measure_stage('generate_corpus', start_time, start_rss, len(list_of_files), 'files',
+                                corpus_size))
+
+    if args.spacy_lang is None:
+        spacy_nlp = create_stub_nlp(terms)
+    else:
+        spacy_nlp = spacy.load(args.spacy_lang)
+    preprocessor = OilAndGasTextPreprocessr()
+    extractor = KeywordExtractor(os.path.join(work_dir, 'topic_model'), args.topics_number,
+                                 args.probability_threshold, args.use_nouns, args.use_verbs,
+                                 batch_size=args.batch_size, n_process=args.workers, max_passes=args.max_passes,
+                                 n_shards=args.shards)
+
+    start_time = time.perf_counter()
+    start_rss = get_current_rss()
+    texts = []
+    for cur_name in list_of_files:
+        texts += preprocessor.get_texts_from_file(cur_name)
+    stages.append(measure_stage('get_texts_from_file', start_time, start_rss, len(texts), 'paragraphs',
+                                corpus_size))
+
+    start_time = time.perf_counter()
+    start_rss = get_current_rss()
+    unused_pipes = SpaCyTokenizer.get_unused_pipes(spacy_nlp, args.use_nouns, args.use_verbs)
+    docs = list(spacy_nlp.pipe(texts, batch_size=args.batch_size, n_process=args.workers, disable=unused_pipes))
+    stages.append(measure_stage('spacy_parsing', start_time, start_rss, len(docs), 'paragraphs'))
+    del texts
+
+    start_time = time.perf_counter()
+    start_rss = get_current_rss()
+    n_phrases = 0
+    for cur_doc in docs:
+        tokens = SpaCyTokenizer.tokenize_document(cur_doc, args.use_nouns, args.use_verbs)
+        if len(tokens) > 0:
+            n_phrases += (tokens.count(' ') + 1)
+    stages.append(measure_stage('tokenize_document', start_time, start_rss, len(docs), 'paragraphs'))
+    stages[-1]['phrases'] = n_phrases
+    del docs
+
+    start_time = time.perf_counter()
+    start_rss = get_current_rss()
+    collection = extractor.create_collection(list_of_files, preprocessor, spacy_nlp, work_dir)
+    n_documents = collection.n_documents
+    stages.append(measure_stage('create_collection', start_time, start_rss, len(list_of_files), 'files',
+                                corpus_size))
+    stages[-1]['documents'] = n_documents
+
+    batches_path = os.path.join(work_dir, 'batches')
+    with collection:
+        start_time = time.perf_counter()
+        start_rss = get_current_rss()
+        batch_names = collection.create_batches(batches_path, extractor.documents_per_batch)
+        stages.append(measure_stage('create_batches', start_time, start_rss, n_documents, 'documents'))
+        stages[-1]['batches'] = len(batch_names)
+
+    start_time = time.perf_counter()
+    start_rss = get_current_rss()
+    dictionary = artm.Dictionary()
+    dictionary.gather(data_path=batches_path)
+    stages.append(measure_stage('gather_dictionary', start_time, start_rss, len(batch_names), 'batches'))
+    batch_vectorizer = artm.BatchVectorizer(data_path=batches_path, data_format='batches')
+
+    start_time = time.perf_counter()
+    start_rss = get_current_rss()
+    topic_model = extractor.create_topic_model(os.path.join(work_dir, 'topic_model'), batch_vectorizer, dictionary)
+    stages.append(measure_stage('create_topic_model', start_time, start_rss, n_documents, 'documents'))
+    stages[-1]['perplexity'] = float(topic_model.score_tracker['perplexity_score'].last_value)
+
+    start_time = time.perf_counter()
+    start_rss = get_current_rss()
+    keywords = extractor.select_keywords_from_topic_model(topic_model)
+    stages.append(measure_stage('select_keywords_from_topic_model', start_time, start_rss, len(keywords),
+                                'keywords'))
+
+    return {
+        'environment': {'python': platform.python_version(), 'platform': platform.platform(),
+                        'spacy': spacy.__version__, 'numpy': np.__version__, 'artm': artm.version(),
+                        'cpu_count': os.cpu_count()},
+        'parameters': dict(vars(args)),
+        'corpus': {'files': len(list_of_files), 'bytes': corpus_size, 'documents': n_documents},
+        'stages': stages,
+        'total_seconds': sum([cur_stage['seconds'] for cur_stage in stages]),
+        'peak_rss_bytes': get_peak_rss(),
+        'children_peak_rss_bytes': get_peak_rss(resource.RUSAGE_CHILDREN)
+    }
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument('-o', '--output', dest='output_name', type=str, required=False, default=None,
+                        help='Name of JSON file into which the benchmark results will be written.')
+    parser.add_argument('-w', '--work-dir', dest='work_dir', type=str, required=False, default=None,
+                        help='A directory for the synthetic corpus and the created artifacts.')
+    parser.add_argument('--files', dest='files_number', type=int, required=False, default=20,
+                        help='Number of files in the synthetic corpus.')
+    parser.add_argument('--paragraphs', dest='paragraphs_per_file', type=int, required=False, default=50,
+                        help='Number of paragraphs in a single file.')
+    parser.add_argument('--lines', dest='lines_per_paragraph', type=int, required=False, default=5,
+                        help='Number of lines in a single paragraph.')
+    parser.add_argument('--terms', dest='terms_per_topic', type=int, required=False, default=30,
+                        help='Number of terms in a single synthetic topic.')
+    parser.add_argument('--topics', dest='topics_number', type=int, required=False, default=10,
+                        help='Number of topics.')
+    parser.add_argument('--probability', dest='probability_threshold', type=float, required=False, default=1e-2,
+                        help='Minimal probability of keyword.')
+    parser.add_argument('--spacy', dest='spacy_lang', type=str, required=False, default=None,
+                        help='The SpaCy model name. A blank model with an entity ruler is used if it is not '
+                             'specified.')
+    parser.add_argument('--nouns', dest='use_nouns', action='store_true', required=False,
+                        help='Do we want to use the noun phrases for keyword selection?')
+    parser.add_argument('--verbs', dest='use_verbs', action='store_true', required=False,
+                        help='Do we want to use the root verbs for keyword selection?')
+    parser.add_argument('--workers', dest='workers', type=int, required=False, default=1,
+                        help='Number of processes for the text parsing with SpaCy.')
+    parser.add_argument('--shards', dest='shards', type=int, required=False, default=1,
+                        help='Number of processes for the parallel ingestion of source files.')
+    parser.add_argument('--batch-size', dest='batch_size', type=int, required=False, default=1000,
+                        help='Number of texts in a single batch for the text parsing with SpaCy.')
+    parser.add_argument('--max-passes', dest='max_passes', type=int, required=False, default=10,
+                        help='Maximal number of passes through the collection for topic modeling.')
+    parser.add_argument('--seed', dest='random_seed', type=int, required=False, default=0,
+                        help='Random seed for the synthetic corpus generation.')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    assert args.files_number > 0, '{0} is too small number of files!'.format(args.files_number)
+    assert args.paragraphs_per_file > 0, '{0} is too small number of paragraphs!'.format(args.paragraphs_per_file)
+    assert args.lines_per_paragraph > 0, '{0} is too small number of lines!'.format(args.lines_per_paragraph)
+    assert args.terms_per_topic > 0, '{0} is too small number of terms!'.format(args.terms_per_topic)
+    assert args.topics_number > 1, '{0} is too small number of topics!'.format(args.topics_number)
+    assert (args.spacy_lang is not None) or ((not args.use_nouns) and (not args.use_verbs)), \
+        'The noun phrases and the root verbs need a SpaCy model with a parser, which is specified by --spacy!'
+    results = run_benchmark(args)
+    if args.output_name is None:
+        print(json.dumps(results, ensure_ascii=False, indent=4))
+    else:
+        with codecs.open(args.output_name, mode='w', encoding='utf-8', errors='ignore') as fp:
+            json.dump(results, fp, ensure_ascii=False, indent=4)
+
+
+if __name__ == '__main__':
+    main()
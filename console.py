@@ -1,13 +1,13 @@
 from argparse import ArgumentParser
 import codecs
-import importlib
+import cProfile
+import json
+import logging
 import os
-from typing import List
+from typing import List, Tuple
 
-import spacy
-
-from keyword_extraction.tokenization import BaseTextPreprocessor
-from keyword_extraction.keyword_extraction import KeywordExtractor
+from keyword_extraction.artifacts import BaseKeywordExtractor, create_preprocessor, get_preprocessor_name
+from keyword_extraction.instrumentation import PipelineMetrics
 
 
 def select_text_files(dir_name: str) -> List[str]:
@@ -23,10 +23,22 @@ def select_text_files(dir_name: str) -> List[str]:
     ))
 
 
-def create_preprocessor(preprocessor_class_name: str) -> BaseTextPreprocessor:
-    module = importlib.import_module('keyword_extraction.tokenization')
-    class_name = getattr(module, preprocessor_class_name)
-    return class_name()
+def select_annotation_files(name: str) -> List[str]:
+    if os.path.isfile(name):
+        return [name]
+    return list(filter(lambda it: it.endswith('.jsonl') or it.endswith('.spacy'), select_text_files(name)))
+
+
+def select_keywords_from_corpus(list_of_files: List[str], preprocessor_class_name: str, spacy_lang: str,
+                                extractor_parameters: dict) -> Tuple[List[str], PipelineMetrics]:
+    cached_result = BaseKeywordExtractor(**extractor_parameters).select_from_cache(
+        list_of_files, get_preprocessor_name(preprocessor_class_name), spacy_lang
+    )
+    if cached_result is not None:
+        return cached_result
+    from keyword_extraction.keyword_extraction import KeywordExtractor
+    extractor = KeywordExtractor(**extractor_parameters)
+    return extractor.select_from_corpus(list_of_files, create_preprocessor(preprocessor_class_name), spacy_lang)
 
 
 def select_keywords(args):
@@ -37,27 +49,168 @@ def select_keywords(args):
     names_of_source_files = select_text_files(os.path.normpath(args.source_dir))
     assert len(names_of_source_files) > 0, 'Directory `{0}` is empty!'.format(args.source_dir)
     topic_model_name = os.path.normpath(args.topic_model_name)
-    text_preprocessor = create_preprocessor(args.text_preprocessor)
     n_topics = args.topics_number
     assert n_topics > 1, '{0} is too small number of topics!'.format(n_topics)
     prob_threshold = args.probability_threshold
     assert prob_threshold > 0.0, '{0} is too small probability threshold!'.format(prob_threshold)
     assert prob_threshold < 1.0, '{0} is too large probability threshold!'.format(prob_threshold)
-    extractor = KeywordExtractor(topic_model_name, n_topics, prob_threshold, args.use_nouns, args.use_verbs)
-    spacy_nlp = spacy.load(args.spacy_lang)
-    keywords = extractor.select_from_corpus(names_of_source_files, text_preprocessor, spacy_nlp)
+    assert args.workers > 0, '{0} is too small number of workers!'.format(args.workers)
+    assert args.batch_size > 0, '{0} is too small size of batch!'.format(args.batch_size)
+    assert args.max_passes > 0, '{0} is too small number of passes!'.format(args.max_passes)
+    assert args.tolerance >= 0.0, '{0} is incorrect tolerance!'.format(args.tolerance)
+    assert args.restarts > 0, '{0} is too small number of restarts!'.format(args.restarts)
+    assert args.shards > 0, '{0} is too small number of shards!'.format(args.shards)
+    if args.artifacts_cache_size is not None:
+        assert args.artifacts_cache_size > 0, '{0} is too small size of the artifacts cache!'.format(
+            args.artifacts_cache_size)
+    if args.profile_name is not None:
+        profile_dir = os.path.dirname(os.path.normpath(args.profile_name))
+        if len(profile_dir) > 0:
+            assert os.path.isdir(profile_dir), 'The directory `{0}` does not exist!'.format(profile_dir)
+    if args.metrics_name is not None:
+        metrics_dir = os.path.dirname(os.path.normpath(args.metrics_name))
+        if len(metrics_dir) > 0:
+            assert os.path.isdir(metrics_dir), 'The directory `{0}` does not exist!'.format(metrics_dir)
+    if args.topics_per_chunk is not None:
+        assert args.topics_per_chunk > 0, '{0} is too small number of topics per chunk!'.format(args.topics_per_chunk)
+    extractor_parameters = {
+        'topic_model_name': topic_model_name, 'number_of_topics': n_topics, 'probability_threshold': prob_threshold,
+        'extract_noun_phrases': args.use_nouns, 'extract_root_verbs': args.use_verbs, 'batch_size': args.batch_size,
+        'n_process': args.workers, 'documents_cache_dir': args.documents_cache_dir, 'incremental': args.incremental,
+        'save_uci': args.save_uci, 'max_passes': args.max_passes, 'tolerance': args.tolerance,
+        'n_restarts': args.restarts, 'topics_per_chunk': args.topics_per_chunk, 'n_shards': args.shards,
+        'artifacts_cache_dir': args.artifacts_cache_dir,
+        'artifacts_cache_size': (None if args.artifacts_cache_size is None
+                                 else args.artifacts_cache_size * 1024 * 1024)
+    }
+    if args.profile_name is None:
+        keywords, metrics = select_keywords_from_corpus(names_of_source_files, args.text_preprocessor,
+                                                        args.spacy_lang, extractor_parameters)
+    else:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            keywords, metrics = select_keywords_from_corpus(names_of_source_files, args.text_preprocessor,
+                                                            args.spacy_lang, extractor_parameters)
+        finally:
+            profiler.disable()
+            profiler.dump_stats(os.path.normpath(args.profile_name))
+    if args.metrics_name is not None:
+        with codecs.open(os.path.normpath(args.metrics_name), mode='w', encoding='utf-8', errors='ignore') as fp:
+            json.dump(metrics.to_dict(), fp, ensure_ascii=False, indent=4)
     assert len(keywords) > 0, 'Keywords list is empty!'
     with codecs.open(keywords_list_name, mode='w', encoding='utf-8', errors='ignore') as fp:
         for cur_keyword in keywords:
             fp.write('{0}\n'.format(cur_keyword))
 
 
+def sweep_keywords(args):
+    from keyword_extraction.keyword_extraction import KeywordExtractor
+    destination_dir = os.path.normpath(args.destination_dir)
+    if not os.path.isdir(destination_dir):
+        os.makedirs(destination_dir)
+    names_of_source_files = select_text_files(os.path.normpath(args.source_dir))
+    assert len(names_of_source_files) > 0, 'Directory `{0}` is empty!'.format(args.source_dir)
+    topic_model_name = os.path.normpath(args.topic_model_name)
+    text_preprocessor = create_preprocessor(args.text_preprocessor)
+    numbers_of_topics = sorted(set(args.topics_numbers))
+    for n_topics in numbers_of_topics:
+        assert n_topics > 1, '{0} is too small number of topics!'.format(n_topics)
+    probability_thresholds = sorted(set(args.probability_thresholds))
+    for prob_threshold in probability_thresholds:
+        assert prob_threshold > 0.0, '{0} is too small probability threshold!'.format(prob_threshold)
+        assert prob_threshold < 1.0, '{0} is too large probability threshold!'.format(prob_threshold)
+    assert args.workers > 0, '{0} is too small number of workers!'.format(args.workers)
+    assert args.batch_size > 0, '{0} is too small size of batch!'.format(args.batch_size)
+    assert args.max_passes > 0, '{0} is too small number of passes!'.format(args.max_passes)
+    assert args.tolerance >= 0.0, '{0} is incorrect tolerance!'.format(args.tolerance)
+    assert args.shards > 0, '{0} is too small number of shards!'.format(args.shards)
+    assert args.sweep_workers > 0, '{0} is too small number of sweep workers!'.format(args.sweep_workers)
+    if args.artifacts_cache_size is not None:
+        assert args.artifacts_cache_size > 0, '{0} is too small size of the artifacts cache!'.format(
+            args.artifacts_cache_size)
+    extractor = KeywordExtractor(topic_model_name, numbers_of_topics[0], probability_thresholds[0], args.use_nouns,
+                                 args.use_verbs, batch_size=args.batch_size, n_process=args.workers,
+                                 documents_cache_dir=args.documents_cache_dir, max_passes=args.max_passes,
+                                 tolerance=args.tolerance, n_shards=args.shards,
+                                 artifacts_cache_dir=args.artifacts_cache_dir,
+                                 artifacts_cache_size=(None if args.artifacts_cache_size is None
+                                                       else args.artifacts_cache_size * 1024 * 1024))
+    results, metrics = extractor.sweep_from_corpus(names_of_source_files, text_preprocessor, args.spacy_lang,
+                                                   numbers_of_topics, probability_thresholds,
+                                                   n_workers=args.sweep_workers)
+    if args.metrics_name is not None:
+        with codecs.open(os.path.normpath(args.metrics_name), mode='w', encoding='utf-8', errors='ignore') as fp:
+            json.dump(metrics.to_dict(), fp, ensure_ascii=False, indent=4)
+    with codecs.open(os.path.join(destination_dir, 'summary.tsv'), mode='w', encoding='utf-8',
+                     errors='ignore') as summary_fp:
+        summary_fp.write('topics\tprobability\tperplexity\tsparsity_phi\tsparsity_theta\tkeywords\tfile\n')
+        for cur_result in results:
+            keywords_list_name = 'keywords_topics{0}_probability{1}.txt'.format(
+                cur_result['number_of_topics'], cur_result['probability_threshold'])
+            with codecs.open(os.path.join(destination_dir, keywords_list_name), mode='w', encoding='utf-8',
+                             errors='ignore') as fp:
+                for cur_keyword in cur_result['keywords']:
+                    fp.write('{0}\n'.format(cur_keyword))
+            summary_fp.write('{0}\t{1}\t{2:.6f}\t{3:.6f}\t{4:.6f}\t{5}\t{6}\n'.format(
+                cur_result['number_of_topics'], cur_result['probability_threshold'], cur_result['perplexity_score'],
+                cur_result['sparsity_phi_score'], cur_result['sparsity_theta_score'], len(cur_result['keywords']),
+                keywords_list_name))
+
+
 def use_ner(args):
-    pass
+    import spacy
+    from keyword_extraction.annotation import KeywordAnnotator
+    annotations_name = os.path.normpath(args.destination_annotations)
+    annotations_dir = os.path.dirname(annotations_name)
+    if len(annotations_dir) > 0:
+        assert os.path.isdir(annotations_dir), 'The directory `{0}` does not exist!'.format(annotations_dir)
+    keywords_list_name = os.path.normpath(args.keywords_list)
+    assert os.path.isfile(keywords_list_name), 'File `{0}` does not exist!'.format(keywords_list_name)
+    names_of_source_files = select_text_files(os.path.normpath(args.source_dir))
+    assert len(names_of_source_files) > 0, 'Directory `{0}` is empty!'.format(args.source_dir)
+    text_preprocessor = create_preprocessor(args.text_preprocessor)
+    assert args.workers > 0, '{0} is too small number of workers!'.format(args.workers)
+    assert args.batch_size > 0, '{0} is too small size of batch!'.format(args.batch_size)
+    keywords = KeywordAnnotator.load_keywords(keywords_list_name)
+    assert len(keywords) > 0, 'Keywords list `{0}` is empty!'.format(keywords_list_name)
+    annotator = KeywordAnnotator(keywords, label=args.label, batch_size=args.batch_size, n_process=args.workers)
+    spacy_nlp = spacy.load(args.spacy_lang)
+    n_documents = annotator.annotate_corpus(names_of_source_files, text_preprocessor, spacy_nlp, annotations_name)
+    assert n_documents > 0, 'There are no documents in the directory `{0}`!'.format(args.source_dir)
 
 
 def train_ner(args):
-    pass
+    import spacy
+    from keyword_extraction.training import NERTrainer
+    model_dir = os.path.normpath(args.model_dir)
+    model_parent_dir = os.path.dirname(model_dir)
+    if len(model_parent_dir) > 0:
+        assert os.path.isdir(model_parent_dir), 'The directory `{0}` does not exist!'.format(model_parent_dir)
+    training_files = select_annotation_files(os.path.normpath(args.training_data))
+    assert len(training_files) > 0, 'There are no training data in `{0}`!'.format(args.training_data)
+    if args.dev_data is None:
+        dev_files = None
+    else:
+        dev_files = select_annotation_files(os.path.normpath(args.dev_data))
+        assert len(dev_files) > 0, 'There are no development data in `{0}`!'.format(args.dev_data)
+    assert args.epochs > 0, '{0} is too small number of epochs!'.format(args.epochs)
+    assert (args.dropout >= 0.0) and (args.dropout < 1.0), '{0} is incorrect dropout rate!'.format(args.dropout)
+    assert args.batch_start >= 1.0, '{0} is too small initial size of batch!'.format(args.batch_start)
+    assert args.batch_stop >= args.batch_start, '{0} is too small final size of batch!'.format(args.batch_stop)
+    assert args.batch_compound >= 1.0, '{0} is incorrect compounding rate!'.format(args.batch_compound)
+    assert args.shuffle_buffer > 0, '{0} is too small size of the shuffle buffer!'.format(args.shuffle_buffer)
+    if args.checkpoint_steps is not None:
+        assert args.checkpoint_steps > 0, '{0} is too small number of steps!'.format(args.checkpoint_steps)
+    trainer = NERTrainer(model_dir, n_epochs=args.epochs, dropout=args.dropout, batch_start=args.batch_start,
+                         batch_stop=args.batch_stop, batch_compound=args.batch_compound,
+                         shuffle_buffer=args.shuffle_buffer, checkpoint_steps=args.checkpoint_steps,
+                         random_seed=args.random_seed)
+    if args.spacy_lang is None:
+        spacy_nlp = spacy.blank(args.language)
+    else:
+        spacy_nlp = spacy.load(args.spacy_lang)
+    trainer.train(training_files, spacy_nlp, dev_files)
 
 
 def main():
@@ -67,29 +220,157 @@ def main():
     parser_ner = subparsers.add_parser('ner')
     parser_training = subparsers.add_parser('training')
     parser_prepare_keywords = subparsers.add_parser('keywords')
+    parser_sweep = subparsers.add_parser('sweep')
+
+    parser_ner.add_argument('-s', '--src', dest='source_dir', type=str, required=True,
+                            help='A directory with source text files.')
+    parser_ner.add_argument('-k', '--keywords', dest='keywords_list', type=str, required=True,
+                            help='Name of text file with a keywords list created by the `keywords` mode.')
+    parser_ner.add_argument('-d', '--dst', dest='destination_annotations', type=str, required=True,
+                            help='Name of JSONL file into which the annotated texts will be written.')
+    parser_ner.add_argument('-p', '--preprocessor', dest='text_preprocessor', type=str, required=True,
+                            help='Name of the text preprocessor class.')
+    parser_ner.add_argument('--spacy', dest='spacy_lang', type=str, required=False, default='en_core_web_lg',
+                            help='The SpaCy model name.')
+    parser_ner.add_argument('--label', dest='label', type=str, required=False, default='KEYWORD',
+                            help='Label of the annotated keyword spans.')
+    parser_ner.add_argument('--workers', dest='workers', type=int, required=False, default=1,
+                            help='Number of processes for the text tokenization with SpaCy.')
+    parser_ner.add_argument('--batch-size', dest='batch_size', type=int, required=False, default=1000,
+                            help='Number of texts in a single batch for the text tokenization with SpaCy.')
 
-    parser_prepare_keywords.add_argument('-s', '--src', 'source_dir', type=str, required=True,
+    parser_training.add_argument('-t', '--train', dest='training_data', type=str, required=True,
+                                 help='A JSONL file or a DocBin file (or a directory with them) with training data.')
+    parser_training.add_argument('--dev', dest='dev_data', type=str, required=False, default=None,
+                                 help='A JSONL file or a DocBin file (or a directory with them) with development '
+                                      'data.')
+    parser_training.add_argument('-m', '--model', dest='model_dir', type=str, required=True,
+                                 help='A directory into which the trained NER model and its checkpoints will be '
+                                      'written.')
+    parser_training.add_argument('--spacy', dest='spacy_lang', type=str, required=False, default=None,
+                                 help='The SpaCy model name for fine-tuning. A blank model is used if it is not '
+                                      'specified.')
+    parser_training.add_argument('--lang', dest='language', type=str, required=False, default='en',
+                                 help='Language of the blank SpaCy model.')
+    parser_training.add_argument('--epochs', dest='epochs', type=int, required=False, default=10,
+                                 help='Number of training epochs.')
+    parser_training.add_argument('--dropout', dest='dropout', type=float, required=False, default=0.2,
+                                 help='Dropout rate.')
+    parser_training.add_argument('--batch-start', dest='batch_start', type=float, required=False, default=4.0,
+                                 help='Initial size of batch for the compounding schedule.')
+    parser_training.add_argument('--batch-stop', dest='batch_stop', type=float, required=False, default=32.0,
+                                 help='Final size of batch for the compounding schedule.')
+    parser_training.add_argument('--batch-compound', dest='batch_compound', type=float, required=False,
+                                 default=1.001, help='Compounding rate of the batch size.')
+    parser_training.add_argument('--shuffle-buffer', dest='shuffle_buffer', type=int, required=False,
+                                 default=10000, help='Number of examples which are shuffled in memory.')
+    parser_training.add_argument('--checkpoint-steps', dest='checkpoint_steps', type=int, required=False,
+                                 default=None, help='Number of training steps between checkpoints inside an epoch.')
+    parser_training.add_argument('--seed', dest='random_seed', type=int, required=False, default=0,
+                                 help='Random seed for shuffling of the training data.')
+
+    parser_prepare_keywords.add_argument('-s', '--src', dest='source_dir', type=str, required=True,
                                          help='A directory with source text files.')
-    parser_prepare_keywords.add_argument('-d', '--dst', 'destination_keywords_list', type=str, required=True,
+    parser_prepare_keywords.add_argument('-d', '--dst', dest='destination_keywords_list', type=str, required=True,
                                          help='Name of text file into which a created keywords list will be written.')
-    parser_prepare_keywords.add_argument('-n', '--name', 'topic_model_name', type=str, required=True,
+    parser_prepare_keywords.add_argument('-n', '--name', dest='topic_model_name', type=str, required=True,
                                          help='Name of file into which a created topic model will be written.')
-    parser_prepare_keywords.add_argument('-p', '--preprocessor', 'text_preprocessor', type=str, required=True,
+    parser_prepare_keywords.add_argument('-p', '--preprocessor', dest='text_preprocessor', type=str, required=True,
                                          help='Name of the text preprocessor class.')
-    parser_prepare_keywords.add_argument('--topics', 'topics_number', type=int, required=False, default=50,
+    parser_prepare_keywords.add_argument('--topics', dest='topics_number', type=int, required=False, default=50,
                                          help='Number of topics.')
-    parser_prepare_keywords.add_argument('--probability', 'probability_threshold', type=float, required=False,
+    parser_prepare_keywords.add_argument('--probability', dest='probability_threshold', type=float, required=False,
                                          default=1e-2, help='Minimal probability of keyword.')
-    parser_prepare_keywords.add_argument('--spacy', 'spacy_lang', type=str, required=False, default='en_core_web_lg',
-                                         help='The SpaCy model name.')
-    parser_prepare_keywords.add_argument('--nouns', 'use_nouns', action='store_true', type=bool, required=False,
+    parser_prepare_keywords.add_argument('--spacy', dest='spacy_lang', type=str, required=False,
+                                         default='en_core_web_lg', help='The SpaCy model name.')
+    parser_prepare_keywords.add_argument('--nouns', dest='use_nouns', action='store_true', required=False,
                                          help='Do we want to use the noun phrases for keyword selection?')
-    parser_prepare_keywords.add_argument('--verbs', 'use_verbs', action='store_true', type=bool, required=False,
+    parser_prepare_keywords.add_argument('--verbs', dest='use_verbs', action='store_true', required=False,
                                          help='Do we want to use the root verbs for keyword selection?')
+    parser_prepare_keywords.add_argument('--workers', dest='workers', type=int, required=False, default=1,
+                                         help='Number of processes for the text parsing with SpaCy.')
+    parser_prepare_keywords.add_argument('--batch-size', dest='batch_size', type=int, required=False, default=1000,
+                                         help='Number of texts in a single batch for the text parsing with SpaCy.')
+    parser_prepare_keywords.add_argument('--cache', dest='documents_cache_dir', type=str, required=False,
+                                         default=None, help='A directory for caching of documents parsed by SpaCy.')
+    parser_prepare_keywords.add_argument('--incremental', dest='incremental', action='store_true', required=False,
+                                         help='Do we want to add only new source files into the existing topic model?')
+    parser_prepare_keywords.add_argument('--uci', dest='save_uci', action='store_true', required=False,
+                                         help='Do we want to save the collection in the UCI Bag-of-Words format too?')
+    parser_prepare_keywords.add_argument('--shards', dest='shards', type=int, required=False, default=1,
+                                         help='Number of processes for the parallel ingestion of source files, each '
+                                              'with its own copy of the SpaCy model.')
+    parser_prepare_keywords.add_argument('--max-passes', dest='max_passes', type=int, required=False, default=30,
+                                         help='Maximal number of passes through the collection for topic modeling.')
+    parser_prepare_keywords.add_argument('--tolerance', dest='tolerance', type=float, required=False, default=1e-3,
+                                         help='Minimal relative change of perplexity before early stopping.')
+    parser_prepare_keywords.add_argument('--restarts', dest='restarts', type=int, required=False, default=1,
+                                         help='Number of topic models trained in parallel with different seeds.')
+    parser_prepare_keywords.add_argument('--topics-per-chunk', dest='topics_per_chunk', type=int, required=False,
+                                         default=None, help='Number of topics in a single chunk of the Phi matrix '
+                                                            'for keyword selection.')
+    parser_prepare_keywords.add_argument('--artifacts-cache', dest='artifacts_cache_dir', type=str, required=False,
+                                         default=None, help='A directory for the collections and topic models keyed '
+                                                            'by their parameters (`<name>.artifacts` by default).')
+    parser_prepare_keywords.add_argument('--artifacts-cache-size', dest='artifacts_cache_size', type=int,
+                                         required=False, default=None,
+                                         help='Maximal size of the artifacts cache in megabytes. The least recently '
+                                              'used entries are evicted above it.')
+    parser_prepare_keywords.add_argument('--profile', dest='profile_name', type=str, required=False, default=None,
+                                         help='Name of file into which the cProfile statistics of the run will be '
+                                              'written.')
+    parser_prepare_keywords.add_argument('--metrics', dest='metrics_name', type=str, required=False, default=None,
+                                         help='Name of JSON file into which the per-stage metrics of the run will be '
+                                              'written.')
+
+    parser_sweep.add_argument('-s', '--src', dest='source_dir', type=str, required=True,
+                              help='A directory with source text files.')
+    parser_sweep.add_argument('-d', '--dst', dest='destination_dir', type=str, required=True,
+                              help='A directory into which the keywords lists and their summary will be written.')
+    parser_sweep.add_argument('-n', '--name', dest='topic_model_name', type=str, required=True,
+                              help='Base name of the topic models (the artifacts cache is `<name>.artifacts` by '
+                                   'default).')
+    parser_sweep.add_argument('-p', '--preprocessor', dest='text_preprocessor', type=str, required=True,
+                              help='Name of the text preprocessor class.')
+    parser_sweep.add_argument('--topics', dest='topics_numbers', type=int, nargs='+', required=True,
+                              help='Numbers of topics to be compared.')
+    parser_sweep.add_argument('--probability', dest='probability_thresholds', type=float, nargs='+',
+                              required=True, help='Minimal probabilities of keyword to be compared.')
+    parser_sweep.add_argument('--spacy', dest='spacy_lang', type=str, required=False, default='en_core_web_lg',
+                              help='The SpaCy model name.')
+    parser_sweep.add_argument('--nouns', dest='use_nouns', action='store_true', required=False,
+                              help='Do we want to use the noun phrases for keyword selection?')
+    parser_sweep.add_argument('--verbs', dest='use_verbs', action='store_true', required=False,
+                              help='Do we want to use the root verbs for keyword selection?')
+    parser_sweep.add_argument('--workers', dest='workers', type=int, required=False, default=1,
+                              help='Number of processes for the text parsing with SpaCy.')
+    parser_sweep.add_argument('--batch-size', dest='batch_size', type=int, required=False, default=1000,
+                              help='Number of texts in a single batch for the text parsing with SpaCy.')
+    parser_sweep.add_argument('--cache', dest='documents_cache_dir', type=str, required=False, default=None,
+                              help='A directory for caching of documents parsed by SpaCy.')
+    parser_sweep.add_argument('--shards', dest='shards', type=int, required=False, default=1,
+                              help='Number of processes for the parallel ingestion of source files.')
+    parser_sweep.add_argument('--max-passes', dest='max_passes', type=int, required=False, default=30,
+                              help='Maximal number of passes through the collection for topic modeling.')
+    parser_sweep.add_argument('--tolerance', dest='tolerance', type=float, required=False, default=1e-3,
+                              help='Minimal relative change of perplexity before early stopping.')
+    parser_sweep.add_argument('--sweep-workers', dest='sweep_workers', type=int, required=False, default=1,
+                              help='Number of topic models trained in parallel.')
+    parser_sweep.add_argument('--artifacts-cache', dest='artifacts_cache_dir', type=str, required=False,
+                              default=None, help='A directory for the collections and topic models keyed by their '
+                                                 'parameters (`<name>.artifacts` by default).')
+    parser_sweep.add_argument('--artifacts-cache-size', dest='artifacts_cache_size', type=int, required=False,
+                              default=None, help='Maximal size of the artifacts cache in megabytes. The least recently '
+                                                 'used entries are evicted above it.')
+    parser_sweep.add_argument('--metrics', dest='metrics_name', type=str, required=False, default=None,
+                              help='Name of JSON file into which the per-stage metrics of the sweep will be written.')
 
     args = main_parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
     if args.usage == 'keywords':
         select_keywords(args)
+    elif args.usage == 'sweep':
+        sweep_keywords(args)
     elif args.usage == 'training':
         train_ner(args)
     elif args.usage == 'ner':
@@ -0,0 +1,127 @@
+import codecs
+import json
+import logging
+import os
+import time
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+from spacy.attrs import IS_PUNCT, IS_SPACE, NORM
+from spacy.language import Language
+from spacy.strings import StringStore
+from spacy.tokens.doc import Doc
+
+from keyword_extraction.tokenization import BaseTextPreprocessor
+
+
+keyword_extraction_logger = logging.getLogger(__name__)
+
+
+class KeywordAnnotator:
+    def __init__(self, keywords: List[str], label: str='KEYWORD', batch_size: int=1000, n_process: int=1,
+                 report_interval: int=10000):
+        if len(label.strip()) == 0:
+            raise ValueError('A label for the keywords is empty!')
+        if batch_size < 1:
+            raise ValueError('{0} is too small size of batch for the text parsing!'.format(batch_size))
+        if n_process < 1:
+            raise ValueError('{0} is too small number of processes for the text parsing!'.format(n_process))
+        if report_interval < 1:
+            raise ValueError('{0} is too small interval for the throughput reporting!'.format(report_interval))
+        self.label = label.strip()
+        self.batch_size = batch_size
+        self.n_process = n_process
+        self.report_interval = report_interval
+        self.keywords_trie = self.create_keywords_trie(keywords)
+
+    @staticmethod
+    def load_keywords(file_name: str) -> List[str]:
+        keywords = []
+        with codecs.open(file_name, mode='r', encoding='utf-8', errors='ignore') as fp:
+            for cur_line in fp:
+                prep_line = cur_line.strip()
+                if len(prep_line) > 0:
+                    keywords.append(prep_line)
+        return keywords
+
+    @staticmethod
+    def create_keywords_trie(keywords: List[str]) -> Dict[int, dict]:
+        string_store = StringStore()
+        keywords_trie = dict()
+        for cur_keyword in keywords:
+            tokens = list(filter(lambda it: len(it) > 0, cur_keyword.replace('_', ' ').split(' ')))
+            if len(tokens) == 0:
+                continue
+            trie_node = keywords_trie
+            for cur_token in tokens:
+                trie_node = trie_node.setdefault(string_store.add(cur_token), dict())
+            trie_node[-1] = ' '.join(tokens)
+        return keywords_trie
+
+    def find_keywords(self, doc: Doc) -> List[Tuple[int, int, str]]:
+        if len(doc) == 0:
+            return []
+        attributes = doc.to_array([NORM, IS_PUNCT, IS_SPACE])
+        text_indices = np.flatnonzero((attributes[:, 1] == 0) & (attributes[:, 2] == 0)).tolist()
+        norms = attributes[:, 0].tolist()
+        found_keywords = []
+        position = 0
+        while position < len(text_indices):
+            trie_node = self.keywords_trie.get(norms[text_indices[position]])
+            match_end = -1
+            matched_keyword = ''
+            end_position = position
+            while trie_node is not None:
+                end_position += 1
+                if -1 in trie_node:
+                    match_end = end_position
+                    matched_keyword = trie_node[-1]
+                if end_position >= len(text_indices):
+                    break
+                trie_node = trie_node.get(norms[text_indices[end_position]])
+            if match_end > position:
+                found_keywords.append((text_indices[position], text_indices[match_end - 1] + 1, matched_keyword))
+                position = match_end
+            else:
+                position += 1
+        return found_keywords
+
+    def annotate_corpus(self, list_of_files: List[str], preprocessor: BaseTextPreprocessor, spacy_nlp: Language,
+                        annotations_name: str) -> int:
+        n_documents = 0
+        n_spans = 0
+        start_time = time.perf_counter()
+        with codecs.open(annotations_name + '.tmp', mode='w', encoding='utf-8', errors='ignore') as fp:
+            for annotation in self.annotate_files(list_of_files, preprocessor, spacy_nlp):
+                fp.write(json.dumps(annotation, ensure_ascii=False) + '\n')
+                n_documents += 1
+                n_spans += len(annotation['spans'])
+                if n_documents % self.report_interval == 0:
+                    elapsed_time = max(time.perf_counter() - start_time, 1e-9)
+                    keyword_extraction_logger.info('{0} documents have been annotated ({1:.1f} documents per '
+                                                   'second).'.format(n_documents, n_documents / elapsed_time))
+        os.replace(annotations_name + '.tmp', annotations_name)
+        elapsed_time = max(time.perf_counter() - start_time, 1e-9)
+        keyword_extraction_logger.info('{0} documents with {1} keyword spans have been annotated in {2:.1f} seconds '
+                                       '({3:.1f} documents per second).'.format(n_documents, n_spans, elapsed_time,
+                                                                                n_documents / elapsed_time))
+        return n_documents
+
+    def annotate_files(self, list_of_files: List[str], preprocessor: BaseTextPreprocessor,
+                       spacy_nlp: Language) -> Iterator[dict]:
+        texts_with_meta = (
+            (cur_text, (file_idx, paragraph_idx))
+            for file_idx, cur_name in enumerate(list_of_files)
+            for paragraph_idx, cur_text in enumerate(preprocessor.iter_texts_from_file(cur_name))
+        )
+        for cur_doc, (file_idx, paragraph_idx) in spacy_nlp.pipe(texts_with_meta, as_tuples=True,
+                                                                 batch_size=self.batch_size, n_process=self.n_process,
+                                                                 disable=spacy_nlp.pipe_names):
+            spans = []
+            for span_start, span_end, keyword in self.find_keywords(cur_doc):
+                spans.append({'start': cur_doc[span_start].idx,
+                              'end': cur_doc[span_end - 1].idx + len(cur_doc[span_end - 1].text),
+                              'token_start': span_start, 'token_end': span_end - 1, 'label': self.label,
+                              'keyword': keyword})
+            yield {'text': cur_doc.text, 'spans': spans,
+                   'meta': {'file': list_of_files[file_idx], 'paragraph': paragraph_idx}}
@@ -0,0 +1,376 @@
+import codecs
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+import shutil
+import time
+from typing import Dict, List, Tuple, TYPE_CHECKING, Union
+
+import numpy as np
+
+from keyword_extraction.instrumentation import PipelineMetrics, get_size_of_path
+
+if TYPE_CHECKING:
+    from spacy.language import Language
+    from keyword_extraction.tokenization import BaseTextPreprocessor
+
+
+keyword_extraction_logger = logging.getLogger(__name__)
+
+
+def load_spacy_model_meta(spacy_lang: str) -> Union[dict, None]:
+    if os.path.isdir(spacy_lang):
+        meta_name = os.path.join(spacy_lang, 'meta.json')
+    else:
+        try:
+            model_spec = importlib.util.find_spec(spacy_lang)
+        except (ImportError, ValueError):
+            model_spec = None
+        if (model_spec is None) or (model_spec.origin is None):
+            return None
+        meta_name = os.path.join(os.path.dirname(model_spec.origin), 'meta.json')
+    if not os.path.isfile(meta_name):
+        return None
+    with codecs.open(meta_name, mode='r', encoding='utf-8', errors='ignore') as fp:
+        return json.load(fp)
+
+
+def get_preprocessor_name(preprocessor: Union[str, 'BaseTextPreprocessor']) -> str:
+    if not isinstance(preprocessor, str):
+        return '{0}.{1}'.format(type(preprocessor).__module__, type(preprocessor).__name__)
+    if '.' in preprocessor:
+        return preprocessor
+    return '{0}.{1}'.format('keyword_extraction.tokenization', preprocessor)
+
+
+def create_preprocessor(preprocessor_name: str) -> 'BaseTextPreprocessor':
+    module_name, class_name = get_preprocessor_name(preprocessor_name).rsplit('.', 1)
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+def get_spacy_model_name(spacy_nlp: Union[str, 'Language']) -> str:
+    if isinstance(spacy_nlp, str):
+        meta = load_spacy_model_meta(spacy_nlp)
+        if meta is None:
+            raise ValueError('The SpaCy model `{0}` cannot be found!'.format(spacy_nlp))
+    else:
+        meta = spacy_nlp.meta
+    return '{0}_{1}-{2}'.format(meta.get('lang', ''), meta.get('name', ''), meta.get('version', ''))
+
+
+class ArtifactCache:
+    def __init__(self, cache_dir: str, max_size: Union[int, None]=None, max_unfinished_age: float=3600.0):
+        if len(cache_dir.strip()) == 0:
+            raise ValueError('A directory name for the artifacts cache is empty!')
+        if (max_size is not None) and (max_size < 1):
+            raise ValueError('{0} is too small size of the artifacts cache!'.format(max_size))
+        if max_unfinished_age < 0.0:
+            raise ValueError('{0} is incorrect age of unfinished cache entries!'.format(max_unfinished_age))
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.max_unfinished_age = max_unfinished_age
+
+    @staticmethod
+    def get_key(*inputs) -> str:
+        return hashlib.sha256(json.dumps(inputs, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def get_marker_name(entry_path: str) -> str:
+        return os.path.join(entry_path, '.complete')
+
+    def get_entry_path(self, stage_name: str, key: str) -> str:
+        return os.path.join(self.cache_dir, '{0}_{1}'.format(stage_name, key[:32]))
+
+    def contains(self, entry_path: str) -> bool:
+        return os.path.isfile(self.get_marker_name(entry_path))
+
+    def create_entry(self, entry_path: str):
+        if os.path.isdir(entry_path):
+            shutil.rmtree(entry_path)
+        os.makedirs(entry_path)
+
+    def commit_entry(self, entry_path: str):
+        with open(self.get_marker_name(entry_path), 'w'):
+            pass
+
+    def invalidate_entry(self, entry_path: str):
+        if self.contains(entry_path):
+            os.remove(self.get_marker_name(entry_path))
+
+    def touch(self, entry_path: str):
+        if self.contains(entry_path):
+            os.utime(self.get_marker_name(entry_path))
+
+    @staticmethod
+    def get_modification_time(entry_path: str) -> float:
+        modification_time = os.path.getmtime(entry_path)
+        for dir_name, _, file_names in os.walk(entry_path):
+            for cur_name in [dir_name] + [os.path.join(dir_name, it) for it in file_names]:
+                try:
+                    modification_time = max(modification_time, os.path.getmtime(cur_name))
+                except OSError:
+                    pass
+        return modification_time
+
+    def evict(self, protected_entries: List[str]):
+        if self.max_size is None:
+            return
+        protected_entries = set([os.path.normpath(cur_path) for cur_path in protected_entries])
+        entries = []
+        total_size = 0
+        for cur_name in os.listdir(self.cache_dir):
+            entry_path = os.path.normpath(os.path.join(self.cache_dir, cur_name))
+            if not os.path.isdir(entry_path):
+                continue
+            entry_size = get_size_of_path(entry_path)
+            total_size += entry_size
+            if entry_path in protected_entries:
+                continue
+            if self.contains(entry_path):
+                last_access_time = os.path.getmtime(self.get_marker_name(entry_path))
+            elif (time.time() - self.get_modification_time(entry_path)) < self.max_unfinished_age:
+                keyword_extraction_logger.info('Cache entry `{0}` is not evicted because it may be written by another '
+                                               'process now.'.format(entry_path))
+                continue
+            else:
+                last_access_time = 0.0
+            entries.append((last_access_time, entry_path, entry_size))
+        entries.sort()
+        for _, entry_path, entry_size in entries:
+            if total_size <= self.max_size:
+                break
+            shutil.rmtree(entry_path, ignore_errors=True)
+            total_size -= entry_size
+            keyword_extraction_logger.info('Cache entry `{0}` has been evicted.'.format(entry_path))
+        if total_size > self.max_size:
+            keyword_extraction_logger.warning('The artifacts cache takes {0} bytes, which exceeds the budget of {1} '
+                                              'bytes because of the entries in use.'.format(total_size, self.max_size))
+
+
+class BaseKeywordExtractor:
+    num_document_passes = 5
+    regularizer_taus = {'sparse_phi_regularizer': -1.0, 'sparse_theta_regularizer': -0.5,
+                        'decorrelator_phi_regularizer': 1e+5}
+
+    def __init__(self, topic_model_name: str, number_of_topics: int, probability_threshold: float=1e-2,
+                 extract_noun_phrases: bool=True, extract_root_verbs: bool=False, batch_size: int=1000,
+                 n_process: int=1, documents_cache_dir: Union[str, None]=None, incremental: bool=False,
+                 save_uci: bool=False, documents_per_batch: int=1000, max_passes: int=30, tolerance: float=1e-3,
+                 n_restarts: int=1, topics_per_chunk: Union[int, None]=None, n_shards: int=1,
+                 artifacts_cache_dir: Union[str, None]=None, artifacts_cache_size: Union[int, None]=None):
+        if batch_size < 1:
+            raise ValueError('{0} is too small size of batch for the text parsing!'.format(batch_size))
+        if n_process < 1:
+            raise ValueError('{0} is too small number of processes for the text parsing!'.format(n_process))
+        if documents_per_batch < 1:
+            raise ValueError('{0} is too small number of documents per batch!'.format(documents_per_batch))
+        if max_passes < 1:
+            raise ValueError('{0} is too small number of passes through the collection!'.format(max_passes))
+        if tolerance < 0.0:
+            raise ValueError('{0} is incorrect tolerance for the perplexity change!'.format(tolerance))
+        if n_restarts < 1:
+            raise ValueError('{0} is too small number of restarts for the topic model!'.format(n_restarts))
+        if (topics_per_chunk is not None) and (topics_per_chunk < 1):
+            raise ValueError('{0} is too small number of topics per chunk!'.format(topics_per_chunk))
+        if n_shards < 1:
+            raise ValueError('{0} is too small number of shards for the corpus ingestion!'.format(n_shards))
+        if (artifacts_cache_size is not None) and (artifacts_cache_size < 1):
+            raise ValueError('{0} is too small size of the artifacts cache!'.format(artifacts_cache_size))
+        self.number_of_topics = number_of_topics
+        self.probability_threshold = probability_threshold
+        self.extract_noun_phrases = extract_noun_phrases
+        self.extract_root_verbs = extract_root_verbs
+        self.topic_model_name = topic_model_name
+        self.batch_size = batch_size
+        self.n_process = n_process
+        self.documents_cache_dir = documents_cache_dir
+        self.incremental = incremental
+        self.save_uci = save_uci
+        self.documents_per_batch = documents_per_batch
+        self.max_passes = max_passes
+        self.tolerance = tolerance
+        self.n_restarts = n_restarts
+        self.topics_per_chunk = topics_per_chunk
+        self.n_shards = n_shards
+        self.artifacts_cache_dir = artifacts_cache_dir
+        self.artifacts_cache_size = artifacts_cache_size
+        self.metrics = PipelineMetrics()
+
+    def get_parameters(self) -> dict:
+        return {'topic_model_name': self.topic_model_name, 'number_of_topics': self.number_of_topics,
+                'probability_threshold': self.probability_threshold,
+                'extract_noun_phrases': self.extract_noun_phrases, 'extract_root_verbs': self.extract_root_verbs,
+                'batch_size': self.batch_size, 'n_process': self.n_process,
+                'documents_cache_dir': self.documents_cache_dir, 'incremental': self.incremental,
+                'save_uci': self.save_uci, 'documents_per_batch': self.documents_per_batch,
+                'max_passes': self.max_passes, 'tolerance': self.tolerance, 'n_restarts': self.n_restarts,
+                'topics_per_chunk': self.topics_per_chunk, 'n_shards': self.n_shards,
+                'artifacts_cache_dir': self.artifacts_cache_dir, 'artifacts_cache_size': self.artifacts_cache_size}
+
+    def select_from_cache(self, list_of_files: List[str], preprocessor_name: str,
+                          spacy_nlp: Union[str, 'Language']) -> Union[Tuple[List[str], PipelineMetrics], None]:
+        if self.incremental:
+            return None
+        if isinstance(spacy_nlp, str) and (load_spacy_model_meta(spacy_nlp) is None):
+            return None
+        self.metrics = PipelineMetrics()
+        topic_model_name, dir_name, base_name = self.check_topic_model_name()
+        artifacts_cache = self.create_artifacts_cache(dir_name, base_name)
+        collection_key = self.get_collection_key(artifacts_cache, list_of_files, preprocessor_name,
+                                                 get_spacy_model_name(spacy_nlp))
+        collection_path = artifacts_cache.get_entry_path('collection', collection_key)
+        model_path = self.get_model_path(artifacts_cache, collection_key)
+        if not (artifacts_cache.contains(collection_path) and artifacts_cache.contains(model_path)):
+            return None
+        if self.save_uci and (not os.path.isfile(os.path.join(collection_path, 'docword.collection.txt'))):
+            return None
+        with self.metrics.measure('keyword_selection'):
+            max_probabilities = self.load_max_probabilities(os.path.join(model_path, 'topic_model'))
+            if max_probabilities is None:
+                return None
+            keywords = self.select_keywords_by_probabilities(max_probabilities[0], max_probabilities[1],
+                                                             self.probability_threshold)
+        keyword_extraction_logger.info('The keywords are selected from the cached topic model `{0}`.'.format(
+            model_path))
+        return self.finish_selection(artifacts_cache, collection_path, model_path, keywords)
+
+    def finish_selection(self, artifacts_cache: ArtifactCache, collection_path: str, model_path: str,
+                         keywords: List[str]) -> Tuple[List[str], PipelineMetrics]:
+        topic_model_name, dir_name, base_name = self.check_topic_model_name()
+        collection_docword_name = os.path.join(collection_path, 'docword.collection.txt')
+        artifacts_cache.touch(collection_path)
+        artifacts_cache.touch(model_path)
+        for model_type in ['.p_wt', '.n_wt']:
+            self.export_artifact(os.path.join(model_path, 'topic_model') + model_type, topic_model_name + model_type)
+        if self.save_uci and os.path.isfile(collection_docword_name):
+            self.export_artifact(collection_docword_name, os.path.join(dir_name, 'docword.' + base_name + '.txt'))
+            self.export_artifact(os.path.join(collection_path, 'vocab.collection.txt'),
+                                 os.path.join(dir_name, 'vocab.' + base_name + '.txt'))
+        artifacts_cache.evict([collection_path, model_path])
+        self.metrics.set_counter('keywords', len(keywords))
+        return keywords, self.metrics
+
+    def check_topic_model_name(self) -> Tuple[str, str, str]:
+        topic_model_name = os.path.normpath(self.topic_model_name.strip())
+        if len(topic_model_name) == 0:
+            raise ValueError('A topic model name is empty!')
+        dir_name = os.path.dirname(topic_model_name)
+        base_name = os.path.basename(topic_model_name)
+        if len(dir_name) == 0:
+            dir_name = os.path.curdir
+        if len(base_name) == 0:
+            raise ValueError('`{0}` is incorrect name for a topic model! Base name of file is empty!'.format(
+                self.topic_model_name))
+        if not os.path.isdir(dir_name):
+            raise ValueError('`{0}` is incorrect name for a topic model! Directory `{1}` does not exist!'.format(
+                self.topic_model_name, dir_name))
+        return topic_model_name, dir_name, base_name
+
+    def create_artifacts_cache(self, dir_name: str, base_name: str) -> ArtifactCache:
+        if self.artifacts_cache_dir is None:
+            return ArtifactCache(os.path.join(dir_name, base_name + '.artifacts'), self.artifacts_cache_size)
+        return ArtifactCache(self.artifacts_cache_dir, self.artifacts_cache_size)
+
+    def get_collection_key(self, artifacts_cache: ArtifactCache, list_of_files: List[str], preprocessor_name: str,
+                           spacy_model_name: str) -> str:
+        collection_parameters = self.get_collection_parameters(preprocessor_name, spacy_model_name)
+        if self.incremental:
+            return artifacts_cache.get_key(collection_parameters)
+        return artifacts_cache.get_key(collection_parameters, self.create_manifest(list_of_files))
+
+    def get_model_path(self, artifacts_cache: ArtifactCache, collection_key: str) -> str:
+        return artifacts_cache.get_entry_path(
+            'topic_model', artifacts_cache.get_key(collection_key, self.get_topic_model_parameters())
+        )
+
+    def get_collection_parameters(self, preprocessor_name: str, spacy_model_name: str) -> dict:
+        return {'preprocessor': preprocessor_name, 'spacy_model': spacy_model_name,
+                'noun_phrases': self.extract_noun_phrases, 'root_verbs': self.extract_root_verbs,
+                'documents_per_batch': self.documents_per_batch}
+
+    def get_topic_model_parameters(self) -> dict:
+        return {'number_of_topics': self.number_of_topics, 'max_passes': self.max_passes,
+                'tolerance': self.tolerance, 'n_restarts': self.n_restarts,
+                'num_document_passes': self.num_document_passes, 'regularizer_taus': self.regularizer_taus}
+
+    @staticmethod
+    def export_artifact(source_name: str, destination_name: str):
+        if os.path.isfile(destination_name):
+            os.remove(destination_name)
+        try:
+            os.link(source_name, destination_name)
+        except OSError:
+            shutil.copyfile(source_name, destination_name)
+
+    @staticmethod
+    def select_keywords_by_thresholds(all_words: np.ndarray, max_probabilities: np.ndarray,
+                                      probability_thresholds: List[float]) -> List[List[str]]:
+        words_order = np.argsort(-max_probabilities, kind='stable')
+        numbers_of_words = np.searchsorted(-max_probabilities[words_order], -np.asarray(probability_thresholds),
+                                           side='right')
+        sorted_words = [cur_word.replace('_', ' ') for cur_word in all_words[words_order[:numbers_of_words.max()]]]
+        return [sorted(set(sorted_words[:number_of_words])) for number_of_words in numbers_of_words.tolist()]
+
+    @staticmethod
+    def select_keywords_by_probabilities(all_words: np.ndarray, max_probabilities: np.ndarray,
+                                         probability_threshold: float) -> List[str]:
+        selected_words = all_words[max_probabilities >= probability_threshold]
+        return sorted(set([cur_word.replace('_', ' ') for cur_word in selected_words]))
+
+    @staticmethod
+    def create_manifest(list_of_files: List[str]) -> Dict[str, Tuple[int, int]]:
+        manifest = dict()
+        for cur_name in list_of_files:
+            file_stat = os.stat(cur_name)
+            manifest[os.path.abspath(cur_name)] = (file_stat.st_mtime_ns, file_stat.st_size)
+        return manifest
+
+    @staticmethod
+    def load_manifest(file_name: str) -> Dict[str, Tuple[int, int]]:
+        with codecs.open(file_name, mode='r', encoding='utf-8', errors='ignore') as fp:
+            data = json.load(fp)
+        return dict([(cur_name, tuple(data[cur_name])) for cur_name in data])
+
+    @staticmethod
+    def save_manifest(manifest: Dict[str, Tuple[int, int]], file_name: str):
+        with codecs.open(file_name + '.tmp', mode='w', encoding='utf-8', errors='ignore') as fp:
+            json.dump(dict([(cur_name, list(manifest[cur_name])) for cur_name in sorted(manifest.keys())]), fp,
+                      ensure_ascii=False, indent=4)
+        os.replace(file_name + '.tmp', file_name)
+
+    @staticmethod
+    def load_consumed_batches(file_name: str) -> Union[List[str], None]:
+        if not os.path.isfile(file_name + '.batches'):
+            return None
+        with codecs.open(file_name + '.batches', mode='r', encoding='utf-8', errors='ignore') as fp:
+            return json.load(fp)
+
+    @staticmethod
+    def save_consumed_batches(batch_names: List[str], file_name: str):
+        with codecs.open(file_name + '.batches.tmp', mode='w', encoding='utf-8', errors='ignore') as fp:
+            json.dump(sorted(batch_names), fp, ensure_ascii=False, indent=4)
+        os.replace(file_name + '.batches.tmp', file_name + '.batches')
+
+    @staticmethod
+    def load_scores(file_name: str) -> Dict[str, float]:
+        if not os.path.isfile(file_name + '.scores'):
+            return dict()
+        with codecs.open(file_name + '.scores', mode='r', encoding='utf-8', errors='ignore') as fp:
+            return json.load(fp)
+
+    @staticmethod
+    def load_max_probabilities(file_name: str) -> Union[Tuple[np.ndarray, np.ndarray], None]:
+        if not os.path.isfile(file_name + '.max_probabilities.npz'):
+            return None
+        with np.load(file_name + '.max_probabilities.npz') as data:
+            return data['words'], data['max_probabilities']
+
+    @staticmethod
+    def save_max_probabilities(all_words: np.ndarray, max_probabilities: np.ndarray, file_name: str):
+        with open(file_name + '.max_probabilities.npz.tmp', 'wb') as fp:
+            np.savez(fp, words=np.asarray(all_words, dtype=str), max_probabilities=max_probabilities)
+        os.replace(file_name + '.max_probabilities.npz.tmp', file_name + '.max_probabilities.npz')
@@ -0,0 +1,48 @@
+import hashlib
+import os
+from typing import List, Union
+
+from spacy.language import Language
+from spacy.tokens import DocBin
+from spacy.tokens.doc import Doc
+from spacy.vocab import Vocab
+
+from keyword_extraction.artifacts import get_preprocessor_name, get_spacy_model_name
+from keyword_extraction.tokenization import BaseTextPreprocessor
+
+
+class ParsedDocumentsCache:
+    def __init__(self, cache_dir: str, preprocessor: BaseTextPreprocessor, spacy_nlp: Language):
+        if len(cache_dir.strip()) == 0:
+            raise ValueError('A directory name for the parsed documents cache is empty!')
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        self.cache_dir = cache_dir
+        self.preprocessor_name = get_preprocessor_name(preprocessor)
+        self.spacy_model_name = get_spacy_model_name(spacy_nlp)
+
+    def get_cache_name(self, file_name: str) -> str:
+        file_stat = os.stat(file_name)
+        key = '\n'.join([os.path.abspath(file_name), str(file_stat.st_mtime_ns), str(file_stat.st_size),
+                         self.preprocessor_name, self.spacy_model_name])
+        return os.path.join(self.cache_dir, hashlib.sha256(key.encode('utf-8')).hexdigest() + '.spacy')
+
+    def load(self, file_name: str, vocab: Vocab) -> Union[List[Doc], None]:
+        cache_name = self.get_cache_name(file_name)
+        if not os.path.isfile(cache_name):
+            return None
+        with open(cache_name, 'rb') as fp:
+            doc_bin = DocBin().from_bytes(fp.read())
+        return list(doc_bin.get_docs(vocab))
+
+    def save(self, file_name: str, docs: List[Doc]):
+        doc_bin = DocBin(attrs=['ORTH', 'NORM', 'TAG', 'POS', 'HEAD', 'DEP', 'ENT_IOB', 'ENT_TYPE'],
+                         store_user_data=False)
+        for cur_doc in docs:
+            doc_bin.add(cur_doc)
+            for cur_token in cur_doc:
+                doc_bin.strings.add(cur_token.norm_)
+        cache_name = self.get_cache_name(file_name)
+        with open(cache_name + '.tmp', 'wb') as fp:
+            fp.write(doc_bin.to_bytes())
+        os.replace(cache_name + '.tmp', cache_name)
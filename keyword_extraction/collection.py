@@ -0,0 +1,189 @@
+from array import array
+import codecs
+import hashlib
+import os
+import shutil
+import tempfile
+import uuid
+from typing import Iterable, Iterator, List, Tuple, Union
+
+import artm
+import numpy as np
+
+
+class BagOfWordsCollection:
+    def __init__(self, spill_dir: str, max_entries_in_memory: int=1000000):
+        if max_entries_in_memory < 1:
+            raise ValueError('{0} is too small number of entries in memory!'.format(max_entries_in_memory))
+        self.max_entries_in_memory = max_entries_in_memory
+        self.chunks_dir = tempfile.mkdtemp(prefix='bow_chunks_', dir=spill_dir)
+        self.chunk_names = []
+        self.vocabulary = []
+        self.IDs_of_tokens = dict()
+        self.token_frequencies = array('Q')
+        self.n_documents = 0
+        self.n_entries = 0
+        self.document_sizes = array('I')
+        self.token_IDs = array('I')
+        self.token_counts = array('I')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        if os.path.isdir(self.chunks_dir):
+            shutil.rmtree(self.chunks_dir, ignore_errors=True)
+        self.chunk_names.clear()
+
+    def add_document(self, tokens: Iterable[str]):
+        token_frequencies = dict()
+        for cur_token in tokens:
+            token_id = self.IDs_of_tokens.get(cur_token)
+            if token_id is None:
+                token_id = len(self.vocabulary)
+                self.IDs_of_tokens[cur_token] = token_id
+                self.vocabulary.append(cur_token)
+                self.token_frequencies.append(0)
+            token_frequencies[token_id] = token_frequencies.get(token_id, 0) + 1
+        if len(token_frequencies) == 0:
+            return
+        for token_id in token_frequencies:
+            self.token_IDs.append(token_id)
+            self.token_counts.append(token_frequencies[token_id])
+            self.token_frequencies[token_id] += token_frequencies[token_id]
+        self.document_sizes.append(len(token_frequencies))
+        self.n_documents += 1
+        self.n_entries += len(token_frequencies)
+        if len(self.token_IDs) >= self.max_entries_in_memory:
+            self.spill()
+
+    def spill(self):
+        if len(self.document_sizes) == 0:
+            return
+        chunk_name = os.path.join(self.chunks_dir, 'chunk_{0:06}.bin'.format(len(self.chunk_names)))
+        with open(chunk_name, 'wb') as fp:
+            array('Q', [len(self.document_sizes), len(self.token_IDs)]).tofile(fp)
+            self.document_sizes.tofile(fp)
+            self.token_IDs.tofile(fp)
+            self.token_counts.tofile(fp)
+        self.chunk_names.append(chunk_name)
+        self.document_sizes = array('I')
+        self.token_IDs = array('I')
+        self.token_counts = array('I')
+
+    def iterate_chunks(self) -> Iterator[Tuple[array, array, array]]:
+        for chunk_name in self.chunk_names:
+            with open(chunk_name, 'rb') as fp:
+                header = array('Q')
+                header.fromfile(fp, 2)
+                document_sizes = array('I')
+                document_sizes.fromfile(fp, header[0])
+                token_IDs = array('I')
+                token_IDs.fromfile(fp, header[1])
+                token_counts = array('I')
+                token_counts.fromfile(fp, header[1])
+            yield document_sizes, token_IDs, token_counts
+        if len(self.document_sizes) > 0:
+            yield self.document_sizes, self.token_IDs, self.token_counts
+
+    def iterate_documents(self, new_IDs: Union[array, None]=None) -> Iterator[Tuple[array, array]]:
+        for document_sizes, token_IDs, token_counts in self.iterate_chunks():
+            if new_IDs is not None:
+                token_IDs = array('I', [new_IDs[token_id] for token_id in token_IDs])
+            entry_idx = 0
+            for document_size in document_sizes:
+                yield token_IDs[entry_idx:(entry_idx + document_size)], \
+                      token_counts[entry_idx:(entry_idx + document_size)]
+                entry_idx += document_size
+
+    def merge(self, other: 'BagOfWordsCollection'):
+        self.spill()
+        new_IDs = np.empty(len(other.vocabulary), dtype=np.uint32)
+        for token_id, cur_token in enumerate(other.vocabulary):
+            new_token_id = self.IDs_of_tokens.get(cur_token)
+            if new_token_id is None:
+                new_token_id = len(self.vocabulary)
+                self.IDs_of_tokens[cur_token] = new_token_id
+                self.vocabulary.append(cur_token)
+                self.token_frequencies.append(0)
+            self.token_frequencies[new_token_id] += other.token_frequencies[token_id]
+            new_IDs[token_id] = new_token_id
+        for document_sizes, token_IDs, token_counts in other.iterate_chunks():
+            self.document_sizes = document_sizes
+            self.token_IDs = array('I', new_IDs[np.frombuffer(token_IDs, dtype=np.uint32)].tobytes())
+            self.token_counts = token_counts
+            self.spill()
+        self.n_documents += other.n_documents
+        self.n_entries += other.n_entries
+
+    def sort_vocabulary(self) -> Tuple[List[str], array]:
+        sorted_vocabulary = sorted(self.vocabulary)
+        IDs_of_sorted_tokens = dict([(token_text, token_idx) for token_idx, token_text in
+                                     enumerate(sorted_vocabulary)])
+        new_IDs = array('I', [IDs_of_sorted_tokens[token_text] for token_text in self.vocabulary])
+        return sorted_vocabulary, new_IDs
+
+    def save_as_bow_uci(self, collection_docword_name: str, collection_vocab_name: str):
+        sorted_vocabulary, new_IDs = self.sort_vocabulary()
+        save_as_bow_uci(sorted_vocabulary, self.iterate_documents(new_IDs), self.n_documents, self.n_entries,
+                        collection_docword_name, collection_vocab_name)
+
+    def create_batches(self, batches_path: str, documents_per_batch: int, first_batch_index: int=0) -> List[str]:
+        return create_batches(self.vocabulary, self.iterate_documents(), batches_path, documents_per_batch,
+                              first_batch_index)
+
+
+def save_as_bow_uci(vocabulary: List[str], documents: Iterable[Tuple[array, array]], n_documents: int,
+                    n_entries: int, collection_docword_name: str, collection_vocab_name: str):
+    with codecs.open(collection_docword_name, mode='w', encoding='utf-8', errors='ignore') as fp:
+        fp.write('{0}\n'.format(n_documents))
+        fp.write('{0}\n'.format(len(vocabulary)))
+        fp.write('{0}\n'.format(n_entries))
+        for document_idx, (token_IDs, token_counts) in enumerate(documents):
+            fp.write(''.join(['{0} {1} {2}\n'.format(document_idx + 1, token_id + 1, token_count)
+                              for token_id, token_count in zip(token_IDs, token_counts)]))
+    with codecs.open(collection_vocab_name, mode='w', encoding='utf-8', errors='ignore') as fp:
+        for cur_token in vocabulary:
+            fp.write('{0}\n'.format(cur_token))
+
+
+def create_batches(vocabulary: List[str], documents: Iterable[Tuple[array, array]], batches_path: str,
+                   documents_per_batch: int, first_batch_index: int=0) -> List[str]:
+    if not os.path.isdir(batches_path):
+        os.makedirs(batches_path)
+    batch_names = []
+    batch = None
+    batch_token_IDs = dict()
+    for document_idx, (token_IDs, token_counts) in enumerate(documents):
+        if batch is None:
+            batch = artm.messages.Batch()
+            batch_token_IDs = dict()
+        item = batch.item.add()
+        item.id = document_idx + 1
+        for token_id, token_count in zip(token_IDs, token_counts):
+            batch_token_id = batch_token_IDs.get(token_id)
+            if batch_token_id is None:
+                batch_token_id = len(batch_token_IDs)
+                batch_token_IDs[token_id] = batch_token_id
+                batch.token.append(vocabulary[token_id])
+                batch.class_id.append('@default_class')
+            item.token_id.append(batch_token_id)
+            item.token_weight.append(float(token_count))
+        if len(batch.item) >= documents_per_batch:
+            batch_names.append(save_batch(batch, batches_path, first_batch_index + len(batch_names)))
+            batch = None
+    if batch is not None:
+        batch_names.append(save_batch(batch, batches_path, first_batch_index + len(batch_names)))
+    return batch_names
+
+
+def save_batch(batch: artm.messages.Batch, batches_path: str, batch_index: int) -> str:
+    batch_hash = hashlib.sha256('{0}\n'.format(batch_index).encode('utf-8') + batch.SerializeToString())
+    batch.id = str(uuid.UUID(bytes=batch_hash.digest()[:16]))
+    batch_name = '{0:06}_{1}.batch'.format(batch_index, batch.id)
+    with open(os.path.join(batches_path, batch_name), 'wb') as fp:
+        fp.write(batch.SerializeToString())
+    return batch_name
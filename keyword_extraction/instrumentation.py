@@ -0,0 +1,147 @@
+from contextlib import contextmanager
+import logging
+import os
+import resource
+import sys
+import time
+from typing import Dict, Iterator, Union
+
+
+keyword_extraction_logger = logging.getLogger(__name__)
+
+
+def get_peak_rss() -> int:
+    peak_rss = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                   resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    if sys.platform == 'darwin':
+        return peak_rss
+    return peak_rss * 1024
+
+
+def get_current_rss() -> Union[int, None]:
+    try:
+        with open('/proc/self/statm', mode='r') as fp:
+            return int(fp.read().split()[1]) * resource.getpagesize()
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def get_maximum(first_value: Union[int, None], second_value: Union[int, None]) -> Union[int, None]:
+    if first_value is None:
+        return second_value
+    if second_value is None:
+        return first_value
+    return max(first_value, second_value)
+
+
+def get_size_of_path(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    if not os.path.isdir(path):
+        return 0
+    total_size = 0
+    for dir_name, _, file_names in os.walk(path):
+        for cur_name in file_names:
+            total_size += os.path.getsize(os.path.join(dir_name, cur_name))
+    return total_size
+
+
+class PipelineMetrics:
+    def __init__(self, report_interval: float=30.0):
+        if report_interval <= 0.0:
+            raise ValueError('{0} is incorrect interval for the progress reporting!'.format(report_interval))
+        self.report_interval = report_interval
+        self.start_time = time.perf_counter()
+        self.stages = dict()
+        self.counters = dict()
+        self.progress_name = ''
+        self.progress_total_files = 0
+        self.progress_total_bytes = 0
+        self.progress_files = 0
+        self.progress_bytes = 0
+        self.progress_start_time = self.start_time
+        self.last_report_time = self.start_time
+
+    @contextmanager
+    def measure(self, stage_name: str) -> Iterator['PipelineMetrics']:
+        start_rss = get_current_rss()
+        start_time = time.perf_counter()
+        try:
+            yield self
+        finally:
+            elapsed_time = time.perf_counter() - start_time
+            self.add_time(stage_name, elapsed_time, start_rss, get_current_rss())
+            keyword_extraction_logger.info('Stage `{0}` has taken {1:.3f} seconds.'.format(stage_name, elapsed_time))
+
+    def add_time(self, stage_name: str, seconds: float, rss_before: Union[int, None]=None,
+                 rss_after: Union[int, None]=None):
+        stage = self.create_stage(stage_name)
+        stage['seconds'] += seconds
+        stage['calls'] += 1
+        if stage['rss_before_bytes'] is None:
+            stage['rss_before_bytes'] = rss_before
+        if rss_after is not None:
+            stage['rss_after_bytes'] = rss_after
+        if (rss_before is not None) and (rss_after is not None):
+            stage['max_rss_growth_bytes'] = get_maximum(stage['max_rss_growth_bytes'], rss_after - rss_before)
+
+    def create_stage(self, stage_name: str) -> Dict[str, Union[float, int, None]]:
+        return self.stages.setdefault(stage_name, {'seconds': 0.0, 'calls': 0, 'rss_before_bytes': None,
+                                                   'rss_after_bytes': None, 'max_rss_growth_bytes': None})
+
+    def increment(self, counter_name: str, value: int=1):
+        self.counters[counter_name] = self.counters.get(counter_name, 0) + value
+
+    def set_counter(self, counter_name: str, value: int):
+        self.counters[counter_name] = value
+
+    def merge(self, other: 'PipelineMetrics'):
+        for stage_name in other.stages:
+            stage = self.create_stage(stage_name)
+            other_stage = other.stages[stage_name]
+            stage['seconds'] += other_stage['seconds']
+            stage['calls'] += other_stage['calls']
+            if stage['rss_before_bytes'] is None:
+                stage['rss_before_bytes'] = other_stage['rss_before_bytes']
+            for field_name in ['rss_after_bytes', 'max_rss_growth_bytes']:
+                stage[field_name] = get_maximum(stage[field_name], other_stage[field_name])
+        for counter_name in other.counters:
+            self.increment(counter_name, other.counters[counter_name])
+
+    def start_progress(self, progress_name: str, total_files: int, total_bytes: int):
+        self.progress_name = progress_name
+        self.progress_total_files = total_files
+        self.progress_total_bytes = total_bytes
+        self.progress_files = 0
+        self.progress_bytes = 0
+        self.progress_start_time = time.perf_counter()
+        self.last_report_time = self.progress_start_time
+
+    def advance_progress(self, n_bytes: int, n_files: int=1):
+        self.progress_files += n_files
+        self.progress_bytes += n_bytes
+        if self.progress_total_files == 0:
+            return
+        cur_time = time.perf_counter()
+        if (cur_time - self.last_report_time < self.report_interval) and \
+                (self.progress_files < self.progress_total_files):
+            return
+        self.last_report_time = cur_time
+        elapsed_time = max(cur_time - self.progress_start_time, 1e-9)
+        bytes_per_second = self.progress_bytes / elapsed_time
+        if (bytes_per_second > 0.0) and (self.progress_total_bytes > self.progress_bytes):
+            eta = int(round((self.progress_total_bytes - self.progress_bytes) / bytes_per_second))
+        else:
+            eta = 0
+        done_part = self.progress_bytes / max(self.progress_total_bytes, 1)
+        keyword_extraction_logger.info('{0}: {1} of {2} files ({3:.1%}), {4:.2f} files per second, {5:.2f} MB per '
+                                       'second, ETA {6}:{7:02}:{8:02}.'.format(
+                                           self.progress_name, self.progress_files, self.progress_total_files,
+                                           done_part, self.progress_files / elapsed_time,
+                                           bytes_per_second / (1024.0 * 1024.0), eta // 3600, (eta // 60) % 60,
+                                           eta % 60))
+
+    def to_dict(self) -> Dict[str, Union[float, int, dict]]:
+        return {'total_seconds': time.perf_counter() - self.start_time, 'process_peak_rss_bytes': get_peak_rss(),
+                'stages': dict([(stage_name, dict(self.stages[stage_name])) for stage_name in self.stages]),
+                'counters': dict(self.counters)}
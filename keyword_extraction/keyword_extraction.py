@@ -1,153 +1,560 @@
 import codecs
+from concurrent.futures import ProcessPoolExecutor
+import copy
+import json
 import logging
+import multiprocessing
 import os
-from typing import List, Union
+import shutil
+import tempfile
+import time
+from typing import Dict, Iterator, List, Tuple, Union
 
 import artm
+import numpy as np
+import spacy
 from spacy.language import Language
+from spacy.tokens.doc import Doc
 
+from keyword_extraction.artifacts import BaseKeywordExtractor, create_preprocessor, get_preprocessor_name
+from keyword_extraction.artifacts import get_spacy_model_name, load_spacy_model_meta
+from keyword_extraction.caching import ParsedDocumentsCache
+from keyword_extraction.collection import BagOfWordsCollection
+from keyword_extraction.instrumentation import PipelineMetrics, get_size_of_path
 from keyword_extraction.tokenization import BaseTextPreprocessor, SpaCyTokenizer
 
 
 keyword_extraction_logger = logging.getLogger(__name__)
 
 
-class KeywordExtractor:
-    def __init__(self, topic_model_name: str, number_of_topics: int, probability_threshold: float=1e-2,
-                 extract_noun_phrases: bool=True, extract_root_verbs: bool=False):
-        self.number_of_topics = number_of_topics
-        self.probability_threshold = probability_threshold
-        self.extract_noun_phrases = extract_noun_phrases
-        self.extract_root_verbs = extract_root_verbs
-        self.topic_model_name = topic_model_name
-
+class KeywordExtractor(BaseKeywordExtractor):
     def select_from_corpus(self, list_of_files: List[str], preprocessor: BaseTextPreprocessor,
-                           spacy_nlp: Language) -> List[str]:
-        topic_model_name = os.path.normpath(self.topic_model_name.strip())
-        if len(topic_model_name) == 0:
-            raise ValueError('A topic model name is empty!')
-        dir_name = os.path.dirname(topic_model_name)
-        base_name = os.path.basename(topic_model_name)
-        if len(dir_name) == 0:
-            dir_name = os.path.curdir
-        if len(base_name) == 0:
-            raise ValueError('`{0}` is incorrect name for a topic model! Base name of file is empty!'.format(
-                self.topic_model_name))
-        if not os.path.isdir(dir_name):
-            raise ValueError('`{0}` is incorrect name for a topic model! Directory `{1}` does not exist!'.format(
-                self.topic_model_name, dir_name))
-        collection_name = os.path.normpath(os.path.join(dir_name, base_name + '.collection'))
-        collection_docword_name = os.path.normpath(os.path.join(dir_name, 'docword.' + base_name + '.collection'))
-        collection_vocab_name = os.path.normpath(os.path.join(dir_name, 'vocab.' + base_name + '.collection'))
-        if (not os.path.isfile(collection_docword_name)) or (not os.path.isfile(collection_vocab_name)):
-            self.create_collection_as_bow_uci(list_of_files, preprocessor, spacy_nlp, collection_docword_name,
-                                              collection_vocab_name)
-        batches_path = os.path.normpath(os.path.join(dir_name, base_name + '.data_batches'))
-        if os.path.isdir(batches_path):
-            batch_vectorizer = artm.BatchVectorizer(data_path=batches_path, data_format='batches')
+                           spacy_nlp: Union[Language, str]) -> Tuple[List[str], PipelineMetrics]:
+        cached_result = self.select_from_cache(list_of_files, get_preprocessor_name(preprocessor), spacy_nlp)
+        if cached_result is not None:
+            return cached_result
+        self.metrics = PipelineMetrics()
+        _, dir_name, base_name = self.check_topic_model_name()
+        artifacts_cache = self.create_artifacts_cache(dir_name, base_name)
+        if isinstance(spacy_nlp, str) and (load_spacy_model_meta(spacy_nlp) is None):
+            spacy_nlp = self.load_spacy_model(spacy_nlp)
+        collection_key = self.get_collection_key(artifacts_cache, list_of_files, get_preprocessor_name(preprocessor),
+                                                 get_spacy_model_name(spacy_nlp))
+        collection_path = artifacts_cache.get_entry_path('collection', collection_key)
+        model_path = self.get_model_path(artifacts_cache, collection_key)
+        collection_docword_name = os.path.join(collection_path, 'docword.collection.txt')
+        batches_path = os.path.join(collection_path, 'batches')
+        dictionary_name = os.path.join(collection_path, 'collection.dict')
+        manifest_name = os.path.join(collection_path, 'collection.manifest')
+        cached_model_name = os.path.join(model_path, 'topic_model')
+        if self.incremental and artifacts_cache.contains(collection_path):
+            keyword_extraction_logger.info('The collection `{0}` will be updated incrementally.'.format(
+                collection_path))
+            artifacts_cache.invalidate_entry(collection_path)
+            with self.metrics.measure('incremental_update'):
+                self.update_collection(list_of_files, preprocessor, spacy_nlp, batches_path, dictionary_name,
+                                       manifest_name)
+            artifacts_cache.commit_entry(collection_path)
+        elif artifacts_cache.contains(collection_path) and \
+                ((not self.save_uci) or os.path.isfile(collection_docword_name)):
+            keyword_extraction_logger.info('The collection is reused from `{0}`.'.format(collection_path))
         else:
-            batch_vectorizer = artm.BatchVectorizer(data_path=dir_name, data_format='bow_uci',
-                                                    collection_name=collection_name, target_folder=batches_path)
+            artifacts_cache.create_entry(collection_path)
+            self.build_collection(list_of_files, preprocessor, spacy_nlp, collection_path)
+            artifacts_cache.commit_entry(collection_path)
         dictionary = artm.Dictionary()
-        dictionary_name = os.path.normpath(topic_model_name + '.dictionary')
-        if os.path.isfile(dictionary_name):
+        with self.metrics.measure('dictionary'):
             dictionary.load(dictionary_name)
-        else:
-            dictionary.gather(data_path=batches_path)
-            dictionary.save(dictionary_name)
-        topic_model = self.load_topic_model(artm.ARTM(num_topics=self.number_of_topics, dictionary=dictionary,
-                                                      cache_theta=False), topic_model_name)
-        if topic_model is None:
-            topic_model = self.create_topic_model(topic_model_name, batch_vectorizer, dictionary)
+        all_batches = self.list_batches(batches_path)
+        consumed_batches = None
+        if self.incremental and artifacts_cache.contains(model_path):
+            consumed_batches = self.load_consumed_batches(cached_model_name)
+            if (consumed_batches is None) or (not set(consumed_batches).issubset(all_batches)):
+                keyword_extraction_logger.warning('The topic model `{0}` does not match the collection, so it will be '
+                                                  'trained again.'.format(model_path))
+                consumed_batches = None
+            artifacts_cache.invalidate_entry(model_path)
+        with self.metrics.measure('topic_model'):
+            if consumed_batches is not None:
+                topic_model = self.update_topic_model(cached_model_name, batches_path, dictionary,
+                                                      sorted(set(all_batches) - set(consumed_batches)))
+                self.save_consumed_batches(all_batches, cached_model_name)
+                artifacts_cache.commit_entry(model_path)
+            elif artifacts_cache.contains(model_path):
+                keyword_extraction_logger.info('The topic model is reused from `{0}`.'.format(model_path))
+                topic_model = self.load_topic_model(artm.ARTM(num_topics=self.number_of_topics,
+                                                              dictionary=dictionary, cache_theta=False),
+                                                    cached_model_name)
+            else:
+                artifacts_cache.create_entry(model_path)
+                if self.n_restarts > 1:
+                    topic_model = self.create_topic_model_in_parallel(cached_model_name, batches_path,
+                                                                      dictionary_name, dictionary)
+                else:
+                    topic_model = self.create_topic_model(
+                        cached_model_name, artm.BatchVectorizer(data_path=batches_path, data_format='batches'),
+                        dictionary
+                    )
+                self.save_consumed_batches(all_batches, cached_model_name)
+                artifacts_cache.commit_entry(model_path)
+                self.metrics.increment('bytes_written', get_size_of_path(model_path))
             if topic_model is None:
                 raise ValueError('The trained topic model cannot be loaded from the file `{0}`!'.format(
-                    topic_model_name))
-        return self.select_keywords_from_topic_model(topic_model)
+                    cached_model_name))
+        with self.metrics.measure('keyword_selection'):
+            all_words, max_probabilities = self.calculate_max_probabilities(topic_model)
+            self.save_max_probabilities(all_words, max_probabilities, cached_model_name)
+            keywords = self.select_keywords_by_probabilities(all_words, max_probabilities, self.probability_threshold)
+        return self.finish_selection(artifacts_cache, collection_path, model_path, keywords)
+
+    def sweep_from_corpus(self, list_of_files: List[str], preprocessor: BaseTextPreprocessor,
+                          spacy_nlp: Union[Language, str], numbers_of_topics: List[int],
+                          probability_thresholds: List[float],
+                          n_workers: int=1) -> Tuple[List[Dict[str, Union[int, float, List[str]]]], PipelineMetrics]:
+        if self.incremental:
+            raise ValueError('The parameter sweep cannot be combined with the incremental mode!')
+        if len(numbers_of_topics) == 0:
+            raise ValueError('A list of numbers of topics is empty!')
+        if len(probability_thresholds) == 0:
+            raise ValueError('A list of probability thresholds is empty!')
+        if n_workers < 1:
+            raise ValueError('{0} is too small number of workers for the parameter sweep!'.format(n_workers))
+        self.metrics = PipelineMetrics()
+        _, dir_name, base_name = self.check_topic_model_name()
+        artifacts_cache = self.create_artifacts_cache(dir_name, base_name)
+        if isinstance(spacy_nlp, str) and (load_spacy_model_meta(spacy_nlp) is None):
+            spacy_nlp = self.load_spacy_model(spacy_nlp)
+        collection_key = self.get_collection_key(artifacts_cache, list_of_files, get_preprocessor_name(preprocessor),
+                                                 get_spacy_model_name(spacy_nlp))
+        collection_path = artifacts_cache.get_entry_path('collection', collection_key)
+        batches_path = os.path.join(collection_path, 'batches')
+        dictionary_name = os.path.join(collection_path, 'collection.dict')
+        if artifacts_cache.contains(collection_path):
+            keyword_extraction_logger.info('The collection is reused from `{0}`.'.format(collection_path))
+        else:
+            artifacts_cache.create_entry(collection_path)
+            self.build_collection(list_of_files, preprocessor, spacy_nlp, collection_path)
+            artifacts_cache.commit_entry(collection_path)
+        extractors = []
+        model_paths = []
+        for number_of_topics in numbers_of_topics:
+            extractor = copy.copy(self)
+            extractor.number_of_topics = number_of_topics
+            extractor.n_restarts = 1
+            extractors.append(extractor)
+            model_paths.append(extractor.get_model_path(artifacts_cache, collection_key))
+        with self.metrics.measure('topic_model'):
+            indices_of_models = [model_idx for model_idx in range(len(model_paths))
+                                 if not artifacts_cache.contains(model_paths[model_idx])]
+            if len(indices_of_models) > 0:
+                n_workers = min(n_workers, len(indices_of_models))
+                num_processors = max(1, (os.cpu_count() - 1) // n_workers)
+                keyword_extraction_logger.info('{0} topic models will be trained by {1} workers.'.format(
+                    len(indices_of_models), n_workers))
+                with ProcessPoolExecutor(max_workers=n_workers,
+                                         mp_context=multiprocessing.get_context('spawn')) as pool:
+                    futures = []
+                    for model_idx in indices_of_models:
+                        artifacts_cache.create_entry(model_paths[model_idx])
+                        futures.append(pool.submit(extractors[model_idx].create_topic_model_from_files,
+                                                   os.path.join(model_paths[model_idx], 'topic_model'), batches_path,
+                                                   dictionary_name, 0, num_processors))
+                    all_batches = self.list_batches(batches_path)
+                    for model_idx, cur_future in zip(indices_of_models, futures):
+                        cur_future.result()
+                        self.save_consumed_batches(all_batches, os.path.join(model_paths[model_idx], 'topic_model'))
+                        artifacts_cache.commit_entry(model_paths[model_idx])
+                        keyword_extraction_logger.info('The topic model with {0} topics has been trained.'.format(
+                            numbers_of_topics[model_idx]))
+        results = []
+        dictionary = None
+        with self.metrics.measure('keyword_selection'):
+            for extractor, model_path in zip(extractors, model_paths):
+                cached_model_name = os.path.join(model_path, 'topic_model')
+                max_probabilities = self.load_max_probabilities(cached_model_name)
+                if max_probabilities is None:
+                    if dictionary is None:
+                        dictionary = artm.Dictionary()
+                        dictionary.load(dictionary_name)
+                    topic_model = self.load_topic_model(artm.ARTM(num_topics=extractor.number_of_topics,
+                                                                  dictionary=dictionary, cache_theta=False),
+                                                        cached_model_name)
+                    if topic_model is None:
+                        raise ValueError('The trained topic model cannot be loaded from the file `{0}`!'.format(
+                            cached_model_name))
+                    max_probabilities = extractor.calculate_max_probabilities(topic_model)
+                    self.save_max_probabilities(max_probabilities[0], max_probabilities[1], cached_model_name)
+                    del topic_model
+                all_words, max_probabilities = max_probabilities
+                scores = self.load_scores(cached_model_name)
+                lists_of_keywords = self.select_keywords_by_thresholds(all_words, max_probabilities,
+                                                                       probability_thresholds)
+                for probability_threshold, keywords in zip(probability_thresholds, lists_of_keywords):
+                    results.append({'number_of_topics': extractor.number_of_topics,
+                                    'probability_threshold': probability_threshold,
+                                    'perplexity_score': scores.get('perplexity_score', float('nan')),
+                                    'sparsity_phi_score': scores.get('sparsity_phi_score', float('nan')),
+                                    'sparsity_theta_score': scores.get('sparsity_theta_score', float('nan')),
+                                    'keywords': keywords})
+                artifacts_cache.touch(model_path)
+        artifacts_cache.touch(collection_path)
+        artifacts_cache.evict([collection_path] + model_paths)
+        self.metrics.set_counter('configurations', len(results))
+        return results, self.metrics
+
+    def build_collection(self, list_of_files: List[str], preprocessor: BaseTextPreprocessor,
+                         spacy_nlp: Union[Language, str], collection_path: str):
+        with self.metrics.measure('ingestion'):
+            collection = self.create_collection(list_of_files, preprocessor, spacy_nlp, collection_path)
+        with collection:
+            self.metrics.set_counter('documents', collection.n_documents)
+            self.metrics.set_counter('vocabulary_size', len(collection.vocabulary))
+            self.metrics.set_counter('entries', collection.n_entries)
+            if collection.n_documents == 0:
+                raise ValueError('There are no documents with selected phrases in the corpus!')
+            if self.save_uci:
+                with self.metrics.measure('uci'):
+                    collection.save_as_bow_uci(os.path.join(collection_path, 'docword.collection.txt'),
+                                               os.path.join(collection_path, 'vocab.collection.txt'))
+            with self.metrics.measure('batches'):
+                collection.create_batches(os.path.join(collection_path, 'batches'), self.documents_per_batch)
+        self.save_manifest(self.create_manifest(list_of_files), os.path.join(collection_path, 'collection.manifest'))
+        with self.metrics.measure('dictionary'):
+            dictionary = artm.Dictionary()
+            dictionary.gather(data_path=os.path.join(collection_path, 'batches'))
+            self.save_dictionary(dictionary, os.path.join(collection_path, 'collection.dict'))
+        self.metrics.increment('bytes_written', get_size_of_path(collection_path))
+
+    @staticmethod
+    def save_dictionary(dictionary: artm.Dictionary, dictionary_name: str):
+        temporary_name = os.path.splitext(dictionary_name)[0] + '.tmp'
+        if os.path.isfile(temporary_name + '.dict'):
+            os.remove(temporary_name + '.dict')
+        dictionary.save(temporary_name)
+        os.replace(temporary_name + '.dict', dictionary_name)
+
+    @staticmethod
+    def load_spacy_model(spacy_nlp: Union[Language, str]) -> Language:
+        if not isinstance(spacy_nlp, str):
+            return spacy_nlp
+        keyword_extraction_logger.info('The SpaCy model `{0}` is loading.'.format(spacy_nlp))
+        return spacy.load(spacy_nlp)
 
     def create_collection_as_bow_uci(self, list_of_files: List[str], preprocessor: BaseTextPreprocessor,
-                                     spacy_nlp: Language, collection_docword_name: str, collection_vocab_name: str):
-        documents = []
-        global_token_frequencies = dict()
-        for cur_name in list_of_files:
-            for cur_text in preprocessor.get_texts_from_file(cur_name):
-                cur_doc = spacy_nlp(cur_text)
-                tokens = SpaCyTokenizer.tokenize_document(cur_doc, self.extract_noun_phrases, self.extract_root_verbs)
+                                     spacy_nlp: Language, collection_docword_name: str,
+                                     collection_vocab_name: str) -> int:
+        spill_dir = os.path.dirname(collection_docword_name)
+        if len(spill_dir) == 0:
+            spill_dir = os.path.curdir
+        with self.create_collection(list_of_files, preprocessor, spacy_nlp, spill_dir) as collection:
+            collection.save_as_bow_uci(collection_docword_name, collection_vocab_name)
+            return collection.n_documents
+
+    def create_collection(self, list_of_files: List[str], preprocessor: BaseTextPreprocessor,
+                          spacy_nlp: Union[Language, str], spill_dir: str) -> BagOfWordsCollection:
+        if (self.n_shards > 1) and (len(list_of_files) > 1):
+            return self.create_collection_in_parallel(list_of_files, preprocessor, spacy_nlp, spill_dir)
+        return self.create_shard_of_collection(list_of_files, preprocessor, self.load_spacy_model(spacy_nlp),
+                                               spill_dir)
+
+    def create_collection_in_parallel(self, list_of_files: List[str], preprocessor: BaseTextPreprocessor,
+                                      spacy_nlp: Union[Language, str], spill_dir: str) -> BagOfWordsCollection:
+        shards = self.split_files_into_shards(list_of_files, min(self.n_shards, len(list_of_files)))
+        keyword_extraction_logger.info('{0} files are split into {1} shards.'.format(len(list_of_files), len(shards)))
+        self.metrics.start_progress('Ingestion', len(list_of_files),
+                                    sum([os.path.getsize(cur_name) for cur_name in list_of_files]))
+        if isinstance(spacy_nlp, str):
+            spacy_model_dir = None
+            spacy_lang = spacy_nlp
+        else:
+            spacy_model_dir = tempfile.mkdtemp(prefix='spacy_model_', dir=spill_dir)
+            spacy_nlp.to_disk(spacy_model_dir)
+            spacy_lang = spacy_model_dir
+        futures = []
+        collection = None
+        try:
+            with ProcessPoolExecutor(max_workers=len(shards), mp_context=multiprocessing.get_context('spawn')) as pool:
+                for files_of_shard in shards:
+                    futures.append(pool.submit(create_shard_in_worker, self.get_parameters(), files_of_shard,
+                                               get_preprocessor_name(preprocessor), spacy_lang, spill_dir))
+                for shard_idx, cur_future in enumerate(futures):
+                    shard, shard_metrics = cur_future.result()
+                    if collection is None:
+                        collection = shard
+                    else:
+                        collection.merge(shard)
+                        shard.close()
+                    self.metrics.merge(shard_metrics)
+                    keyword_extraction_logger.info('Shard {0} of {1} has been merged.'.format(shard_idx + 1,
+                                                                                               len(shards)))
+                    self.metrics.advance_progress(sum([os.path.getsize(cur_name) for cur_name in shards[shard_idx]]),
+                                                  len(shards[shard_idx]))
+        except BaseException:
+            if collection is not None:
+                collection.close()
+            for cur_future in futures:
+                if cur_future.done() and (not cur_future.cancelled()) and (cur_future.exception() is None):
+                    cur_future.result()[0].close()
+            raise
+        finally:
+            if spacy_model_dir is not None:
+                shutil.rmtree(spacy_model_dir, ignore_errors=True)
+        return collection
+
+    def create_shard_of_collection(self, list_of_files: List[str], preprocessor: BaseTextPreprocessor,
+                                   spacy_nlp: Language, spill_dir: str,
+                                   report_progress: bool=True) -> BagOfWordsCollection:
+        if report_progress:
+            self.metrics.start_progress('Ingestion', len(list_of_files),
+                                        sum([os.path.getsize(cur_name) for cur_name in list_of_files]))
+        if self.documents_cache_dir is None:
+            documents_cache = None
+        else:
+            documents_cache = ParsedDocumentsCache(self.documents_cache_dir, preprocessor, spacy_nlp)
+        collection = BagOfWordsCollection(spill_dir)
+        tokenization_time = 0.0
+        try:
+            for cur_doc in self.parse_corpus(list_of_files, preprocessor, spacy_nlp, documents_cache):
+                start_time = time.perf_counter()
+                tokens = SpaCyTokenizer.tokenize_document(cur_doc, self.extract_noun_phrases,
+                                                          self.extract_root_verbs)
+                tokenization_time += (time.perf_counter() - start_time)
+                self.metrics.increment('paragraphs')
+                self.metrics.increment('tokens', len(cur_doc))
                 if len(tokens) > 0:
-                    token_frequencies = dict()
-                    for cur_token in tokens:
-                        token_frequencies[cur_token] = token_frequencies.get(cur_token.lower(), 0) + 1
-                        global_token_frequencies[cur_token] = global_token_frequencies.get(cur_token, 0) + 1
-                    documents.append(token_frequencies)
-            keyword_extraction_logger.info('File `{0}` has been processed.'.format(cur_name))
-        IDs_of_tokens = dict([
-            (token_text, token_idx + 1) for token_idx, token_text in
-            enumerate(sorted(list(global_token_frequencies.keys())))
-        ])
-        with codecs.open(collection_docword_name, mode='w', encoding='utf-8', errors='ignore') as fp:
-            fp.write('{0}\n'.format(len(documents)))
-            fp.write('{0}\n'.format(len(global_token_frequencies)))
-            fp.write('{0}\n'.format(sum([global_token_frequencies[cur_token]
-                                         for cur_token in global_token_frequencies])))
-            for document_idx in range(len(documents)):
-                for cur_token in documents[document_idx]:
-                    fp.write('{0} {1} {2}\n'.format(document_idx + 1, IDs_of_tokens[cur_token],
-                                                    documents[document_idx][cur_token]))
-        with codecs.open(collection_vocab_name, mode='w', encoding='utf-8', errors='ignore') as fp:
-            for cur_token in sorted(list(global_token_frequencies.keys())):
-                fp.write('{0}\n'.format(cur_token))
+                    phrases = tokens.split(' ')
+                    self.metrics.increment('phrases', len(phrases))
+                    collection.add_document(phrases)
+            collection.spill()
+        except BaseException:
+            collection.close()
+            raise
+        self.metrics.add_time('tokenization', tokenization_time)
+        return collection
+
+    @staticmethod
+    def split_files_into_shards(list_of_files: List[str], n_shards: int) -> List[List[str]]:
+        cumulative_sizes = np.cumsum([max(1, os.path.getsize(cur_name)) for cur_name in list_of_files])
+        bounds = np.searchsorted(cumulative_sizes, cumulative_sizes[-1] * np.arange(1, n_shards) / n_shards,
+                                 side='left') + 1
+        bounds = [0] + sorted(set(bounds.tolist()) - {0, len(list_of_files)}) + [len(list_of_files)]
+        return [list_of_files[shard_start:shard_end] for shard_start, shard_end in zip(bounds[:-1], bounds[1:])]
+
+    def parse_corpus(self, list_of_files: List[str], preprocessor: BaseTextPreprocessor, spacy_nlp: Language,
+                     documents_cache: Union[ParsedDocumentsCache, None]=None) -> Iterator[Doc]:
+        if documents_cache is None:
+            unused_pipes = SpaCyTokenizer.get_unused_pipes(spacy_nlp, self.extract_noun_phrases,
+                                                           self.extract_root_verbs)
+            yield from self.parse_files(list_of_files, preprocessor, spacy_nlp, unused_pipes)
+            return
+        unused_pipes = SpaCyTokenizer.get_unused_pipes(spacy_nlp, True, True)
+        files_to_parse = []
+        for cur_name in list_of_files:
+            cached_docs = documents_cache.load(cur_name, spacy_nlp.vocab)
+            if cached_docs is None:
+                files_to_parse.append(cur_name)
+            else:
+                yield from self.parse_files(files_to_parse, preprocessor, spacy_nlp, unused_pipes, documents_cache)
+                files_to_parse = []
+                keyword_extraction_logger.info('File `{0}` has been loaded from the cache.'.format(cur_name))
+                self.metrics.increment('files')
+                self.metrics.increment('cached_files')
+                self.metrics.increment('bytes_read', os.path.getsize(cur_name))
+                self.metrics.advance_progress(os.path.getsize(cur_name))
+                yield from cached_docs
+        yield from self.parse_files(files_to_parse, preprocessor, spacy_nlp, unused_pipes, documents_cache)
+
+    def parse_files(self, list_of_files: List[str], preprocessor: BaseTextPreprocessor, spacy_nlp: Language,
+                    unused_pipes: List[str],
+                    documents_cache: Union[ParsedDocumentsCache, None]=None) -> Iterator[Doc]:
+        if len(list_of_files) == 0:
+            return
+        texts_with_file_indices = (
+            (cur_text, file_idx)
+            for file_idx, cur_name in enumerate(list_of_files)
+            for cur_text in preprocessor.iter_texts_from_file(cur_name)
+        )
+        docs_of_file = []
+        n_processed_files = 0
+        for cur_doc, file_idx in spacy_nlp.pipe(texts_with_file_indices, as_tuples=True, batch_size=self.batch_size,
+                                                n_process=self.n_process, disable=unused_pipes):
+            while n_processed_files < file_idx:
+                self.finish_file(list_of_files[n_processed_files], docs_of_file, documents_cache)
+                docs_of_file = []
+                n_processed_files += 1
+            if documents_cache is not None:
+                docs_of_file.append(cur_doc)
+            yield cur_doc
+        while n_processed_files < len(list_of_files):
+            self.finish_file(list_of_files[n_processed_files], docs_of_file, documents_cache)
+            docs_of_file = []
+            n_processed_files += 1
+
+    def finish_file(self, file_name: str, docs_of_file: List[Doc],
+                    documents_cache: Union[ParsedDocumentsCache, None]):
+        if documents_cache is not None:
+            documents_cache.save(file_name, docs_of_file)
+        keyword_extraction_logger.info('File `{0}` has been processed.'.format(file_name))
+        self.metrics.increment('files')
+        self.metrics.increment('bytes_read', os.path.getsize(file_name))
+        self.metrics.advance_progress(os.path.getsize(file_name))
 
     def select_keywords_from_topic_model(self, topic_model: artm.ARTM) -> List[str]:
-        phi = topic_model.get_phi()
-        all_words = phi.index
-        n_words = all_words.shape[0]
-        set_of_keywords = set()
-        for topic_name in phi.columns:
-            column = phi[topic_name]
-            set_of_keywords |= set(
-                map(
-                    lambda keyword_and_probability: keyword_and_probability[0],
-                    filter(
-                        lambda value: value[1] >= self.probability_threshold,
-                        map(lambda idx: (all_words[idx].replace('_', ' '), column[all_words[idx]]), range(n_words))
-                    )
-                )
-            )
-            del column
-        return sorted(list(set_of_keywords))
+        all_words, max_probabilities = self.calculate_max_probabilities(topic_model)
+        return self.select_keywords_by_probabilities(all_words, max_probabilities, self.probability_threshold)
+
+    def calculate_max_probabilities(self, topic_model: artm.ARTM) -> Tuple[np.ndarray, np.ndarray]:
+        topic_names = list(topic_model.topic_names)
+        topics_per_chunk = len(topic_names) if self.topics_per_chunk is None else self.topics_per_chunk
+        all_words = None
+        max_probabilities = None
+        for chunk_start in range(0, len(topic_names), topics_per_chunk):
+            phi = topic_model.get_phi(topic_names=topic_names[chunk_start:(chunk_start + topics_per_chunk)])
+            if max_probabilities is None:
+                all_words = phi.index.values
+                max_probabilities = phi.values.max(axis=1)
+            else:
+                np.maximum(max_probabilities, phi.values.max(axis=1), out=max_probabilities)
+            del phi
+        return all_words, max_probabilities
 
     def create_topic_model(self, topic_model_name: str, batch_vectorizer: artm.BatchVectorizer,
                            dictionary: artm.Dictionary) -> artm.ARTM:
-        topic_model = artm.ARTM(num_topics=self.number_of_topics, dictionary=dictionary, cache_theta=False)
+        topic_model = self.fit_topic_model(batch_vectorizer, dictionary)
+        self.save_topic_model(topic_model, topic_model_name)
+        return topic_model
+
+    def create_topic_model_in_parallel(self, topic_model_name: str, batches_path: str, dictionary_name: str,
+                                       dictionary: artm.Dictionary) -> Union[artm.ARTM, None]:
+        n_workers = min(self.n_restarts, max(1, os.cpu_count()))
+        num_processors = max(1, (os.cpu_count() - 1) // n_workers)
+        restart_names = ['{0}.restart_{1}'.format(topic_model_name, seed) for seed in range(self.n_restarts)]
+        with ProcessPoolExecutor(max_workers=n_workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            scores = list(pool.map(self.create_topic_model_from_files, restart_names,
+                                   [batches_path for _ in range(self.n_restarts)],
+                                   [dictionary_name for _ in range(self.n_restarts)],
+                                   range(self.n_restarts), [num_processors for _ in range(self.n_restarts)]))
+        best_seed = min(range(self.n_restarts), key=lambda seed: scores[seed])
+        keyword_extraction_logger.info('The best topic model has seed {0} and perplexity {1:.9}.'.format(
+            best_seed, scores[best_seed]))
+        for seed in range(self.n_restarts):
+            for model_type in ['.p_wt', '.n_wt', '.scores']:
+                if seed == best_seed:
+                    os.replace(restart_names[seed] + model_type, topic_model_name + model_type)
+                elif os.path.isfile(restart_names[seed] + model_type):
+                    os.remove(restart_names[seed] + model_type)
+        return self.load_topic_model(artm.ARTM(num_topics=self.number_of_topics, dictionary=dictionary,
+                                               cache_theta=False), topic_model_name)
+
+    def create_topic_model_from_files(self, topic_model_name: str, batches_path: str, dictionary_name: str,
+                                      seed: int, num_processors: int) -> float:
+        batch_vectorizer = artm.BatchVectorizer(data_path=batches_path, data_format='batches')
+        dictionary = artm.Dictionary()
+        dictionary.load(dictionary_name)
+        topic_model = self.fit_topic_model(batch_vectorizer, dictionary, seed, num_processors)
+        self.save_topic_model(topic_model, topic_model_name)
+        return topic_model.score_tracker['perplexity_score'].last_value
+
+    def fit_topic_model(self, batch_vectorizer: artm.BatchVectorizer, dictionary: artm.Dictionary, seed: int=0,
+                        num_processors: Union[int, None]=None) -> artm.ARTM:
+        topic_model = self.configure_topic_model(
+            artm.ARTM(num_topics=self.number_of_topics, dictionary=dictionary, cache_theta=False, seed=seed),
+            dictionary, num_processors
+        )
+        previous_score = None
+        keyword_extraction_logger.info('seed  epoch  perplexity_score  sparsity_phi_score  sparsity_theta_score')
+        for pass_index in range(self.max_passes):
+            topic_model.fit_offline(batch_vectorizer=batch_vectorizer, num_collection_passes=1)
+            cur_score = topic_model.score_tracker['perplexity_score'].last_value
+            keyword_extraction_logger.info('{0:4}  {1:5}  {2:16.9}  {3:18.9}  {4:20.9}'.format(
+                seed, pass_index + 1, cur_score,
+                topic_model.score_tracker['sparsity_phi_score'].last_value,
+                topic_model.score_tracker['sparsity_theta_score'].last_value
+            ))
+            if (previous_score is not None) and \
+                    (abs(previous_score - cur_score) <= self.tolerance * abs(previous_score)):
+                keyword_extraction_logger.info('The topic model with seed {0} has converged after {1} passes.'.format(
+                    seed, pass_index + 1))
+                break
+            previous_score = cur_score
+        return topic_model
+
+    @staticmethod
+    def list_batches(batches_path: str) -> List[str]:
+        return sorted(filter(lambda it: it.endswith('.batch'), os.listdir(batches_path)))
+
+    def update_collection(self, list_of_files: List[str], preprocessor: BaseTextPreprocessor,
+                          spacy_nlp: Union[Language, str], batches_path: str, dictionary_name: str,
+                          manifest_name: str) -> List[str]:
+        manifest = self.load_manifest(manifest_name)
+        new_manifest = self.create_manifest(list_of_files)
+        new_files = []
+        for cur_name in list_of_files:
+            file_key = os.path.abspath(cur_name)
+            if file_key not in manifest:
+                new_files.append(cur_name)
+            elif manifest[file_key] != new_manifest[file_key]:
+                keyword_extraction_logger.warning('File `{0}` has been changed after its ingestion, but changes of '
+                                                  'already ingested files are ignored.'.format(cur_name))
+        if len(new_files) == 0:
+            keyword_extraction_logger.info('There are no new files for the incremental update.')
+            return []
+        keyword_extraction_logger.info('{0} new files will be added into the collection.'.format(len(new_files)))
+        with self.create_collection(new_files, preprocessor, spacy_nlp, os.path.dirname(batches_path)) as collection:
+            new_batches = collection.create_batches(batches_path, self.documents_per_batch,
+                                                    len(self.list_batches(batches_path)))
+        if len(new_batches) > 0:
+            dictionary = artm.Dictionary()
+            dictionary.gather(data_path=batches_path)
+            self.save_dictionary(dictionary, dictionary_name)
+        for cur_name in new_files:
+            file_key = os.path.abspath(cur_name)
+            manifest[file_key] = new_manifest[file_key]
+        self.save_manifest(manifest, manifest_name)
+        return new_batches
+
+    def update_topic_model(self, topic_model_name: str, batches_path: str, dictionary: artm.Dictionary,
+                           new_batches: List[str]) -> artm.ARTM:
+        if len(new_batches) == 0:
+            return self.load_topic_model(artm.ARTM(num_topics=self.number_of_topics, dictionary=dictionary,
+                                                   cache_theta=False), topic_model_name)
+        keyword_extraction_logger.info('{0} new batches will be added into the topic model.'.format(
+            len(new_batches)))
+        topic_model = self.configure_topic_model(
+            artm.ARTM(num_topics=self.number_of_topics, dictionary=dictionary, cache_theta=False),
+            dictionary
+        )
+        previous_nwt_name = 'previous_nwt'
+        topic_model.master.import_model(previous_nwt_name, topic_model_name + '.n_wt')
+        topic_model.master.merge_model({previous_nwt_name: 1.0, topic_model.model_pwt: 1.0},
+                                       nwt=topic_model.model_nwt, dictionary_name=dictionary.name)
+        topic_model.master.normalize_model(pwt=topic_model.model_pwt, nwt=topic_model.model_nwt)
+        topic_model.fit_online(batch_vectorizer=artm.BatchVectorizer(data_path=batches_path, data_format='batches',
+                                                                     batches=new_batches),
+                               update_after=[len(new_batches)], apply_weight=[1.0], decay_weight=[1.0])
+        keyword_extraction_logger.info('perplexity_score  sparsity_phi_score  sparsity_theta_score')
+        keyword_extraction_logger.info('{0:16.9}  {1:18.9}  {2:20.9}'.format(
+            topic_model.score_tracker['perplexity_score'].last_value,
+            topic_model.score_tracker['sparsity_phi_score'].last_value,
+            topic_model.score_tracker['sparsity_theta_score'].last_value
+        ))
+        self.save_topic_model(topic_model, topic_model_name)
+        return topic_model
+
+    @staticmethod
+    def configure_topic_model(topic_model: artm.ARTM, dictionary: artm.Dictionary,
+                              num_processors: Union[int, None]=None) -> artm.ARTM:
         topic_model.scores.add(artm.PerplexityScore(name='perplexity_score', dictionary=dictionary))
         topic_model.scores.add(artm.SparsityPhiScore(name='sparsity_phi_score'))
         topic_model.scores.add(artm.SparsityThetaScore(name='sparsity_theta_score'))
-        topic_model.num_document_passes = 5
-        topic_model.num_processors = max(1, os.cpu_count() - 1)
+        topic_model.num_document_passes = KeywordExtractor.num_document_passes
+        topic_model.num_processors = max(1, os.cpu_count() - 1) if num_processors is None else num_processors
         topic_model.regularizers.add(artm.SmoothSparsePhiRegularizer(name='sparse_phi_regularizer'))
         topic_model.regularizers.add(artm.SmoothSparseThetaRegularizer(name='sparse_theta_regularizer'))
         topic_model.regularizers.add(artm.DecorrelatorPhiRegularizer(name='decorrelator_phi_regularizer'))
-        topic_model.regularizers['sparse_phi_regularizer'].tau = -1.0
-        topic_model.regularizers['sparse_theta_regularizer'].tau = -0.5
-        topic_model.regularizers['decorrelator_phi_regularizer'].tau = 1e+5
-        best_score = None
-        keyword_extraction_logger.info('epoch  perplexity_score  sparsity_phi_score  sparsity_theta_score')
-        for restart_index in range(10):
-            topic_model.fit_offline(batch_vectorizer=batch_vectorizer, num_collection_passes=3)
-            if best_score is None:
-                best_score = topic_model.score_tracker['perplexity_score'].last_value
-            else:
-                if best_score > topic_model.score_tracker['perplexity_score'].last_value:
-                    best_score = topic_model.score_tracker['perplexity_score'].last_value
-                    self.save_topic_model(topic_model, topic_model_name)
-            keyword_extraction_logger.info('{0:5}  {1:16.9}  {2:18.9}  {3:20.9}'.format(
-                (restart_index + 1) * 3,
-                topic_model.score_tracker['perplexity_score'].last_value,
-                topic_model.score_tracker['sparsity_phi_score'].last_value,
-                topic_model.score_tracker['sparsity_theta_score'].last_value
-            ))
-        del topic_model
-        return self.load_topic_model(artm.ARTM(num_topics=self.number_of_topics, dictionary=dictionary,
-                                               cache_theta=False), topic_model_name)
+        for regularizer_name in KeywordExtractor.regularizer_taus:
+            topic_model.regularizers[regularizer_name].tau = KeywordExtractor.regularizer_taus[regularizer_name]
+        return topic_model
 
     @staticmethod
     def load_topic_model(topic_model: artm.ARTM, file_name: str) -> Union[artm.ARTM, None]:
@@ -159,5 +566,24 @@ class KeywordExtractor:
 
     @staticmethod
     def save_topic_model(topic_model: artm.ARTM, file_name: str):
+        for model_file_name in [file_name + '.p_wt', file_name + '.n_wt', file_name + '.max_probabilities.npz']:
+            if os.path.isfile(model_file_name):
+                os.remove(model_file_name)
         topic_model.save(os.path.join(file_name + '.p_wt'), 'p_wt')
         topic_model.save(os.path.join(file_name + '.n_wt'), 'n_wt')
+        scores = dict()
+        for score_name in ['perplexity_score', 'sparsity_phi_score', 'sparsity_theta_score']:
+            if score_name in topic_model.score_tracker:
+                scores[score_name] = float(topic_model.score_tracker[score_name].last_value)
+        with codecs.open(file_name + '.scores.tmp', mode='w', encoding='utf-8', errors='ignore') as fp:
+            json.dump(scores, fp, ensure_ascii=False, indent=4)
+        os.replace(file_name + '.scores.tmp', file_name + '.scores')
+
+
+def create_shard_in_worker(extractor_parameters: dict, list_of_files: List[str], preprocessor_name: str,
+                           spacy_lang: str, spill_dir: str) -> Tuple[BagOfWordsCollection, PipelineMetrics]:
+    extractor = KeywordExtractor(**extractor_parameters)
+    spacy_nlp = extractor.load_spacy_model(spacy_lang)
+    collection = extractor.create_shard_of_collection(list_of_files, create_preprocessor(preprocessor_name),
+                                                      spacy_nlp, spill_dir, False)
+    return collection, extractor.metrics
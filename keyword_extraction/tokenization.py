@@ -1,10 +1,21 @@
-import codecs
 import re
-from typing import Tuple, List
+from typing import Iterator, Tuple, List
 
+import numpy as np
+from spacy.attrs import DEP, ENT_IOB, IS_PUNCT, IS_SPACE, IS_STOP, NORM, POS
+from spacy.language import Language
+from spacy.parts_of_speech import ADP, DET, PRON, PUNCT
 from spacy.tokens.doc import Doc
 
 class SpaCyTokenizer:
+    @staticmethod
+    def get_unused_pipes(spacy_nlp: Language, select_noun_phrases: bool, select_verbs: bool) -> List[str]:
+        unused_pipes = {'textcat', 'textcat_multilabel', 'entity_linker', 'lemmatizer', 'trainable_lemmatizer',
+                        'spancat', 'senter', 'sentencizer'}
+        if (not select_noun_phrases) and (not select_verbs):
+            unused_pipes.add('parser')
+        return [pipe_name for pipe_name in spacy_nlp.pipe_names if pipe_name in unused_pipes]
+
     @staticmethod
     def strip_noun_phrase(doc: Doc, noun_phrase_start: int, noun_phrase_end: int) -> Tuple[int, int]:
         start_token_idx = noun_phrase_start
@@ -34,94 +45,112 @@ class SpaCyTokenizer:
                     tokens.append(token_text)
         return '_'.join(tokens)
 
+    @staticmethod
+    def strip_phrases(is_kept: np.ndarray, phrase_starts: np.ndarray,
+                      phrase_ends: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        kept_indices = np.flatnonzero(is_kept)
+        first_kept = np.searchsorted(kept_indices, phrase_starts, side='left')
+        last_kept = np.searchsorted(kept_indices, phrase_ends, side='left') - 1
+        is_valid = first_kept <= last_kept
+        return kept_indices[first_kept[is_valid]], kept_indices[last_kept[is_valid]] + 1
+
+    @staticmethod
+    def mark_phrases(n_tokens: int, phrase_starts: np.ndarray, phrase_ends: np.ndarray) -> np.ndarray:
+        boundaries = np.zeros(n_tokens + 1, dtype=np.int32)
+        np.add.at(boundaries, phrase_starts, 1)
+        np.add.at(boundaries, phrase_ends, -1)
+        return np.cumsum(boundaries[:n_tokens]) > 0
+
     @staticmethod
     def tokenize_document(doc: Doc, select_noun_phrases: bool, select_verbs: bool) -> str:
         n_tokens = len(doc)
-        used_words = [False for _ in range(n_tokens)]
-        selected_phrases = list()
-        ne_start_idx = -1
-        for token_idx in range(n_tokens):
-            if doc[token_idx].ent_iob_ == 'B':
-                if ne_start_idx >= 0:
-                    can_add = True
-                    for token_idx_2 in range(ne_start_idx, token_idx):
-                        if used_words[token_idx_2]:
-                            can_add = False
-                            break
-                    if can_add:
-                        phrase_bounds = SpaCyTokenizer.strip_noun_phrase(doc, ne_start_idx, token_idx)
-                        if (phrase_bounds[0] >= 0) and (phrase_bounds[1] >= 0):
-                            for token_idx in range(phrase_bounds[0], phrase_bounds[1]):
-                                used_words[token_idx] = True
-                            selected_phrases.append(phrase_bounds)
-                ne_start_idx = token_idx
-            elif doc[token_idx].ent_iob_ != 'I':
-                if ne_start_idx >= 0:
-                    can_add = True
-                    for token_idx_2 in range(ne_start_idx, token_idx):
-                        if used_words[token_idx_2]:
-                            can_add = False
-                            break
-                    if can_add:
-                        phrase_bounds = SpaCyTokenizer.strip_noun_phrase(doc, ne_start_idx, token_idx)
-                        if (phrase_bounds[0] >= 0) and (phrase_bounds[1] >= 0):
-                            for token_idx in range(phrase_bounds[0], phrase_bounds[1]):
-                                used_words[token_idx] = True
-                            selected_phrases.append(phrase_bounds)
-                ne_start_idx = -1
-        if ne_start_idx >= 0:
-            can_add = True
-            for token_idx_2 in range(ne_start_idx, n_tokens):
-                if used_words[token_idx_2]:
-                    can_add = False
-                    break
-            if can_add:
-                phrase_bounds = SpaCyTokenizer.strip_noun_phrase(doc, ne_start_idx, n_tokens)
-                if (phrase_bounds[0] >= 0) and (phrase_bounds[1] >= 0):
-                    for token_idx in range(phrase_bounds[0], phrase_bounds[1]):
-                        used_words[token_idx] = True
-                    selected_phrases.append(phrase_bounds)
+        if n_tokens == 0:
+            return ''
+        attributes = doc.to_array([ENT_IOB, POS, IS_STOP, IS_PUNCT, IS_SPACE, DEP, NORM])
+        is_kept = (attributes[:, 2] == 0) & np.isin(attributes[:, 1], [DET, ADP, PRON, PUNCT], invert=True)
+        ent_iob = attributes[:, 0]
+        entity_starts = np.flatnonzero(ent_iob == 3)
+        outside_indices = np.flatnonzero(ent_iob != 1)
+        entity_end_positions = np.searchsorted(outside_indices, entity_starts, side='right')
+        entity_ends = np.full(entity_starts.shape, n_tokens, dtype=np.int64)
+        has_end = entity_end_positions < outside_indices.shape[0]
+        entity_ends[has_end] = outside_indices[entity_end_positions[has_end]]
+        phrase_starts, phrase_ends = SpaCyTokenizer.strip_phrases(is_kept, entity_starts, entity_ends)
+        used_words = SpaCyTokenizer.mark_phrases(n_tokens, phrase_starts, phrase_ends)
         if select_noun_phrases:
-            for cur_phrase in doc.noun_chunks:
-                phrase_bounds = SpaCyTokenizer.strip_noun_phrase(doc, cur_phrase.start, cur_phrase.end)
-                if (phrase_bounds[0] >= 0) and (phrase_bounds[1] >= 0):
-                    can_add = True
-                    for token_idx_2 in range(phrase_bounds[0], phrase_bounds[1]):
-                        if used_words[token_idx_2]:
-                            can_add = False
-                            break
-                    if can_add:
-                        selected_phrases.append(phrase_bounds)
-                        for token_idx in range(phrase_bounds[0], phrase_bounds[1]):
-                            used_words[token_idx] = True
+            noun_phrases = np.array([(cur_phrase.start, cur_phrase.end) for cur_phrase in doc.noun_chunks],
+                                    dtype=np.int64).reshape((-1, 2))
+            noun_phrase_starts, noun_phrase_ends = SpaCyTokenizer.strip_phrases(is_kept, noun_phrases[:, 0],
+                                                                                noun_phrases[:, 1])
+            if np.all(noun_phrase_starts[1:] >= noun_phrase_ends[:-1]):
+                number_of_used_words = np.concatenate(([0], np.cumsum(used_words)))
+                is_free = (number_of_used_words[noun_phrase_ends] - number_of_used_words[noun_phrase_starts]) == 0
+                used_words |= SpaCyTokenizer.mark_phrases(n_tokens, noun_phrase_starts[is_free],
+                                                          noun_phrase_ends[is_free])
+            else:
+                is_free = np.zeros(noun_phrase_starts.shape, dtype=bool)
+                for phrase_idx, (phrase_start, phrase_end) in enumerate(zip(noun_phrase_starts.tolist(),
+                                                                            noun_phrase_ends.tolist())):
+                    if not used_words[phrase_start:phrase_end].any():
+                        used_words[phrase_start:phrase_end] = True
+                        is_free[phrase_idx] = True
+            noun_phrase_starts = noun_phrase_starts[is_free]
+            noun_phrase_ends = noun_phrase_ends[is_free]
+            phrase_starts = np.concatenate((phrase_starts, noun_phrase_starts))
+            phrase_ends = np.concatenate((phrase_ends, noun_phrase_ends))
         if select_verbs:
-            for token_idx in range(n_tokens):
-                if doc[token_idx].dep == 'ROOT':
-                    if not used_words[token_idx]:
-                        used_words[token_idx] = True
-                        selected_phrases.append((token_idx, token_idx + 1))
-        selected_phrases.sort()
-        return ' '.join(filter(lambda it2: len(it2) > 0, map(lambda it1: SpaCyTokenizer.get_text_of_noun_phrase(
-            doc, it1[0], it1[1]), selected_phrases)))
+            verb_indices = np.flatnonzero((attributes[:, 5] == doc.vocab.strings['ROOT']) & (~used_words))
+            phrase_starts = np.concatenate((phrase_starts, verb_indices))
+            phrase_ends = np.concatenate((phrase_ends, verb_indices + 1))
+        phrase_order = np.lexsort((phrase_ends, phrase_starts))
+        is_text = (attributes[:, 3] == 0) & (attributes[:, 4] == 0)
+        norms = attributes[:, 6].tolist()
+        selected_phrases = []
+        for phrase_start, phrase_end in zip(phrase_starts[phrase_order].tolist(), phrase_ends[phrase_order].tolist()):
+            tokens = []
+            for token_idx in range(phrase_start, phrase_end):
+                if is_text[token_idx]:
+                    token_text = doc.vocab.strings[norms[token_idx]].strip()
+                    if len(token_text) > 0:
+                        tokens.append(token_text)
+            if len(tokens) > 0:
+                selected_phrases.append('_'.join(tokens))
+        return ' '.join(selected_phrases)
 
 
 class BaseTextPreprocessor:
+    re_for_tokenization = [(re.compile(r':'), 1, re.compile(r'\w:\d', re.U)),
+                           (re.compile(r'%'), 1, re.compile(r'\d%\w', re.U)),
+                           (re.compile(r'[\\/]'), 1, re.compile(r'\w[\\/]\w', re.U)),
+                           (re.compile(r'[\\/]'), 2, re.compile(r'.\w[\\/]', re.U)),
+                           (re.compile(r'\+'), 1, re.compile(r'\w\+\w', re.U)),
+                           (re.compile(r'\+'), 2, re.compile(r'.\w\+\S', re.U))]
+
     def get_texts_from_file(self, file_name: str) -> List[str]:
         raise NotImplemented
 
+    def iter_texts_from_file(self, file_name: str) -> Iterator[str]:
+        yield from self.get_texts_from_file(file_name)
+
     @staticmethod
     def tokenize_source_text(source_text: str) -> str:
-        re_for_tokenization = [re.compile(r'\w:\d', re.U), re.compile(r'\d%\w', re.U), re.compile(r'\w[\\/]\w', re.U),
-                               re.compile(r'.\w[\\/]', re.U), re.compile(r'\w\+\w', re.U), re.compile(r'.\w\+\S', re.U)]
         tokenized = source_text.replace('&quot;', '"').replace('&gt;', '>').replace('&lt;', '<')
-        for cur_re in re_for_tokenization:
-            search_res = cur_re.search(tokenized)
-            while search_res is not None:
-                if (search_res.start() < 0) or (search_res.end() < 0):
-                    search_res = None
-                else:
-                    tokenized = tokenized[:(search_res.start() + 2)] + ' ' + tokenized[(search_res.start() + 2):]
-                    search_res = cur_re.search(tokenized, pos=search_res.end() + 1)
+        for re_for_anchor, anchor_position, cur_re in BaseTextPreprocessor.re_for_tokenization:
+            parts_of_text = []
+            start_of_part = 0
+            end_of_match = 0
+            for anchor_res in re_for_anchor.finditer(tokenized):
+                start_of_match = anchor_res.start() - anchor_position
+                if start_of_match < end_of_match:
+                    continue
+                search_res = cur_re.match(tokenized, start_of_match)
+                if search_res is not None:
+                    parts_of_text.append(tokenized[start_of_part:(start_of_match + 2)])
+                    start_of_part = start_of_match + 2
+                    end_of_match = search_res.end()
+            if len(parts_of_text) > 0:
+                parts_of_text.append(tokenized[start_of_part:])
+                tokenized = ' '.join(parts_of_text)
         return tokenized
 
 
@@ -129,44 +158,81 @@ class OilAndGasTextPreprocessr(BaseTextPreprocessor):
     def __init__(self):
         special_unicode_characters = {'\u00A0', '\u2003', '\u2002', '\u2004', '\u2005', '\u2006', '\u2009', '\u200A',
                                       '\u0000', '\r', '\n', '\t'}
-        self.re_for_space = re.compile('[' + ''.join(special_unicode_characters) + ']+', re.U)
-        self.re_for_unicode = re.compile(r'&#\d+;')
+        self.re_for_space_in_text = re.compile(
+            '[' + ''.join(special_unicode_characters - {'\r', '\n'}) + ']+', re.U
+        )
+        self.re_for_unicode = re.compile(r'&#(\d+);')
         self.min_characters_in_line = 20
         self.min_characters_in_text = 200
+        self.max_characters_in_block = 1 << 20
 
     def get_texts_from_file(self, file_name: str) -> List[str]:
-        all_texts = []
+        return list(self.iter_texts_from_file(file_name))
+
+    def iter_texts_from_file(self, file_name: str) -> Iterator[str]:
         lines_of_text = []
-        with codecs.open(file_name, mode='r', encoding='utf-8', errors='ignore') as fp:
-            cur_line = fp.readline()
-            while len(cur_line) > 0:
-                prep_line = cur_line.strip()
+        for source_line, prep_line in self.iter_prepared_lines(file_name):
+            if len(source_line) > 0:
+                prep_line = prep_line.strip()
                 if len(prep_line) > 0:
-                    prep_line = self.tokenize_source_text(prep_line).strip()
-                    if len(prep_line) > 0:
-                        prep_line = self.re_for_space.sub(' ', prep_line).strip()
-                        if len(prep_line) > 0:
-                            search_res = self.re_for_unicode.search(prep_line)
-                            while search_res is not None:
-                                if (search_res.start() < 0) or (search_res.end() < 0):
-                                    search_res = None
-                                else:
-                                    unicode_value = int(prep_line[(search_res.start() + 2):(search_res.end() - 1)])
-                                    prep_line = prep_line[:search_res.start()] + chr(unicode_value) + \
-                                                prep_line[search_res.end():]
-                                    search_res = self.re_for_unicode.search(prep_line)
-                        if len(prep_line) > 0:
-                            lines_of_text.append(prep_line)
-                else:
-                    if len(lines_of_text) > 0:
-                        if all(map(lambda it: len(it) >= self.min_characters_in_line, lines_of_text)):
-                            new_text = lines_of_text[0]
-                            for new_line in lines_of_text[1:]:
-                                if new_text.endswith('-') and (not new_text[-2].isspace()):
-                                    new_text += new_line
-                                else:
-                                    new_text += (' ' + new_line)
-                            if len(new_text) >= self.min_characters_in_text:
-                                all_texts.append(new_text)
-                    lines_of_text.clear()
-        return all_texts
+                    lines_of_text.append(self.decode_unicode_characters(prep_line))
+            else:
+                if len(lines_of_text) > 0:
+                    new_text = self.join_lines(lines_of_text)
+                    if len(new_text) > 0:
+                        yield new_text
+                lines_of_text = []
+
+    def iter_prepared_lines(self, file_name: str) -> Iterator[Tuple[str, str]]:
+        source_lines = []
+        n_characters = 0
+        is_first_block = True
+        with open(file_name, mode='r', encoding='utf-8', errors='ignore', newline='') as fp:
+            for cur_line in fp:
+                for source_line in cur_line.splitlines():
+                    source_lines.append(source_line.strip())
+                    n_characters += (len(source_lines[-1]) + 1)
+                if n_characters >= self.max_characters_in_block:
+                    yield from self.prepare_lines(source_lines, is_first_block)
+                    source_lines = []
+                    n_characters = 0
+                    is_first_block = False
+        yield from self.prepare_lines(source_lines, is_first_block)
+
+    def prepare_lines(self, source_lines: List[str], is_first_block: bool) -> List[Tuple[str, str]]:
+        if is_first_block:
+            prepared_lines = self.tokenize_source_text('\n'.join(source_lines))
+        else:
+            prepared_lines = self.tokenize_source_text('\n' + '\n'.join(source_lines))[1:]
+        return list(zip(source_lines, self.re_for_space_in_text.sub(' ', prepared_lines).split('\n')))
+
+    def decode_unicode_characters(self, source_line: str) -> str:
+        if '&#' not in source_line:
+            return source_line
+        decoded, n_substitutions = self.re_for_unicode.subn(self.replace_unicode_character, source_line)
+        while n_substitutions > 0:
+            decoded, n_substitutions = self.re_for_unicode.subn(self.replace_unicode_character, decoded)
+        return decoded
+
+    @staticmethod
+    def replace_unicode_character(search_res: re.Match) -> str:
+        return chr(int(search_res.group(1)))
+
+    def join_lines(self, lines_of_text: List[str]) -> str:
+        if not all(map(lambda it: len(it) >= self.min_characters_in_line, lines_of_text)):
+            return ''
+        parts_of_text = [lines_of_text[0]]
+        end_of_text = lines_of_text[0][-2:]
+        n_characters = len(lines_of_text[0])
+        for new_line in lines_of_text[1:]:
+            if end_of_text.endswith('-') and (not end_of_text[-2].isspace()):
+                end_of_text = (end_of_text + new_line)[-2:]
+            else:
+                parts_of_text.append(' ')
+                n_characters += 1
+                end_of_text = (' ' + new_line)[-2:]
+            parts_of_text.append(new_line)
+            n_characters += len(new_line)
+        if n_characters < self.min_characters_in_text:
+            return ''
+        return ''.join(parts_of_text)
@@ -0,0 +1,224 @@
+import codecs
+from itertools import islice
+import json
+import logging
+import os
+import pickle
+import random
+import shutil
+from typing import Iterator, List, Union
+
+import spacy
+from spacy.language import Language
+from spacy.scorer import PRFScore
+from spacy.tokens import DocBin
+from spacy.tokens.doc import Doc
+from spacy.training import Example
+from spacy.util import compounding, filter_spans, minibatch
+
+
+keyword_extraction_logger = logging.getLogger(__name__)
+
+
+class NERTrainer:
+    def __init__(self, model_dir: str, n_epochs: int=10, dropout: float=0.2, batch_start: float=4.0,
+                 batch_stop: float=32.0, batch_compound: float=1.001, shuffle_buffer: int=10000,
+                 checkpoint_steps: Union[int, None]=None, random_seed: int=0):
+        if len(model_dir.strip()) == 0:
+            raise ValueError('A directory name for the NER model is empty!')
+        if n_epochs < 1:
+            raise ValueError('{0} is too small number of epochs!'.format(n_epochs))
+        if (dropout < 0.0) or (dropout >= 1.0):
+            raise ValueError('{0} is incorrect dropout rate!'.format(dropout))
+        if (batch_start < 1.0) or (batch_stop < batch_start):
+            raise ValueError('{0} and {1} are incorrect bounds of the batch size!'.format(batch_start, batch_stop))
+        if batch_compound < 1.0:
+            raise ValueError('{0} is incorrect compounding rate of the batch size!'.format(batch_compound))
+        if shuffle_buffer < 1:
+            raise ValueError('{0} is too small size of the shuffle buffer!'.format(shuffle_buffer))
+        if (checkpoint_steps is not None) and (checkpoint_steps < 1):
+            raise ValueError('{0} is too small number of steps between checkpoints!'.format(checkpoint_steps))
+        self.model_dir = os.path.normpath(model_dir)
+        self.n_epochs = n_epochs
+        self.dropout = dropout
+        self.batch_start = batch_start
+        self.batch_stop = batch_stop
+        self.batch_compound = batch_compound
+        self.shuffle_buffer = shuffle_buffer
+        self.checkpoint_steps = checkpoint_steps
+        self.random_seed = random_seed
+        self.checkpoint_dir = os.path.join(self.model_dir, 'checkpoint')
+        self.checkpoint_name = os.path.join(self.checkpoint_dir, 'model-last')
+        self.best_model_name = os.path.join(self.model_dir, 'model-best')
+        self.last_model_name = os.path.join(self.model_dir, 'model-last')
+        self.optimizer_name = os.path.join(self.checkpoint_dir, 'optimizer.pickle')
+        self.state_name = os.path.join(self.checkpoint_dir, 'state.json')
+
+    @staticmethod
+    def iterate_docs(list_of_files: List[str], spacy_nlp: Language) -> Iterator[Doc]:
+        for cur_name in list_of_files:
+            if cur_name.endswith('.spacy'):
+                yield from NERTrainer.iterate_docs_from_docbin(cur_name, spacy_nlp)
+            else:
+                yield from NERTrainer.iterate_docs_from_jsonl(cur_name, spacy_nlp)
+
+    @staticmethod
+    def iterate_docs_from_jsonl(file_name: str, spacy_nlp: Language) -> Iterator[Doc]:
+        with codecs.open(file_name, mode='r', encoding='utf-8', errors='ignore') as fp:
+            for line_idx, cur_line in enumerate(fp):
+                prep_line = cur_line.strip()
+                if len(prep_line) == 0:
+                    continue
+                annotation = json.loads(prep_line)
+                if ('text' not in annotation) or ('spans' not in annotation):
+                    raise ValueError('Line {0} of file `{1}` is not an annotated text!'.format(line_idx + 1,
+                                                                                              file_name))
+                doc = spacy_nlp.make_doc(annotation['text'])
+                spans = []
+                for cur_span in annotation['spans']:
+                    span = doc.char_span(cur_span['start'], cur_span['end'], label=cur_span['label'],
+                                         alignment_mode='contract')
+                    if span is not None:
+                        spans.append(span)
+                doc.ents = filter_spans(spans)
+                yield doc
+
+    @staticmethod
+    def iterate_docs_from_docbin(file_name: str, spacy_nlp: Language) -> Iterator[Doc]:
+        doc_bin = DocBin().from_disk(file_name)
+        yield from doc_bin.get_docs(spacy_nlp.vocab)
+
+    @staticmethod
+    def collect_labels(list_of_files: List[str], spacy_nlp: Language) -> List[str]:
+        labels = set()
+        for cur_doc in NERTrainer.iterate_docs(list_of_files, spacy_nlp):
+            for cur_entity in cur_doc.ents:
+                labels.add(cur_entity.label_)
+        return sorted(labels)
+
+    def iterate_examples(self, list_of_files: List[str], spacy_nlp: Language, epoch: int) -> Iterator[Example]:
+        random_generator = random.Random(self.random_seed + epoch)
+        buffer = []
+        for cur_doc in self.iterate_docs(list_of_files, spacy_nlp):
+            buffer.append(Example(spacy_nlp.make_doc(cur_doc.text), cur_doc))
+            if len(buffer) >= self.shuffle_buffer:
+                random_generator.shuffle(buffer)
+                yield from buffer
+                buffer = []
+        random_generator.shuffle(buffer)
+        yield from buffer
+
+    def evaluate(self, dev_files: List[str], spacy_nlp: Language) -> float:
+        score = PRFScore()
+        for batch in minibatch(self.iterate_docs(dev_files, spacy_nlp), size=self.shuffle_buffer):
+            for reference_doc, predicted_doc in zip(batch, spacy_nlp.pipe([cur_doc.text for cur_doc in batch])):
+                score.score_set(
+                    set([(cur_entity.start_char, cur_entity.end_char, cur_entity.label_)
+                         for cur_entity in predicted_doc.ents]),
+                    set([(cur_entity.start_char, cur_entity.end_char, cur_entity.label_)
+                         for cur_entity in reference_doc.ents])
+                )
+        return score.fscore
+
+    def load_state(self) -> Union[dict, None]:
+        if os.path.isdir(self.checkpoint_dir + '.tmp'):
+            shutil.rmtree(self.checkpoint_dir + '.tmp')
+        if os.path.isdir(self.checkpoint_dir + '.old'):
+            if os.path.isdir(self.checkpoint_dir):
+                shutil.rmtree(self.checkpoint_dir + '.old')
+            else:
+                os.replace(self.checkpoint_dir + '.old', self.checkpoint_dir)
+        if not (os.path.isfile(self.state_name) and os.path.isfile(self.optimizer_name) and
+                os.path.isdir(self.checkpoint_name)):
+            return None
+        with codecs.open(self.state_name, mode='r', encoding='utf-8', errors='ignore') as fp:
+            return json.load(fp)
+
+    def save_checkpoint(self, spacy_nlp: Language, optimizer, state: dict):
+        temporary_dir = self.checkpoint_dir + '.tmp'
+        if os.path.isdir(temporary_dir):
+            shutil.rmtree(temporary_dir)
+        os.makedirs(temporary_dir)
+        spacy_nlp.to_disk(os.path.join(temporary_dir, os.path.basename(self.checkpoint_name)))
+        with open(os.path.join(temporary_dir, os.path.basename(self.optimizer_name)), 'wb') as fp:
+            pickle.dump(optimizer, fp)
+        with codecs.open(os.path.join(temporary_dir, os.path.basename(self.state_name)), mode='w', encoding='utf-8',
+                         errors='ignore') as fp:
+            json.dump(state, fp, ensure_ascii=False, indent=4)
+        if os.path.isdir(self.checkpoint_dir):
+            if os.path.isdir(self.checkpoint_dir + '.old'):
+                shutil.rmtree(self.checkpoint_dir + '.old')
+            os.replace(self.checkpoint_dir, self.checkpoint_dir + '.old')
+        os.replace(temporary_dir, self.checkpoint_dir)
+        if os.path.isdir(self.checkpoint_dir + '.old'):
+            shutil.rmtree(self.checkpoint_dir + '.old')
+
+    @staticmethod
+    def save_model(spacy_nlp: Language, model_name: str):
+        spacy_nlp.to_disk(model_name + '.tmp')
+        if os.path.isdir(model_name):
+            shutil.rmtree(model_name)
+        os.replace(model_name + '.tmp', model_name)
+
+    def prepare_model(self, training_files: List[str], spacy_nlp: Language):
+        labels = self.collect_labels(training_files, spacy_nlp)
+        if len(labels) == 0:
+            raise ValueError('There are no named entities in the training data!')
+        keyword_extraction_logger.info('Labels of named entities are: {0}.'.format(', '.join(labels)))
+        if 'ner' in spacy_nlp.pipe_names:
+            ner = spacy_nlp.get_pipe('ner')
+            for cur_label in labels:
+                ner.add_label(cur_label)
+        else:
+            ner = spacy_nlp.add_pipe('ner')
+            for cur_label in labels:
+                ner.add_label(cur_label)
+            ner.initialize(lambda: islice(self.iterate_examples(training_files, spacy_nlp, 0), 100), nlp=spacy_nlp)
+        return spacy_nlp.resume_training()
+
+    def train(self, training_files: List[str], spacy_nlp: Language,
+              dev_files: Union[List[str], None]=None) -> Language:
+        spacy.require_cpu()
+        if not os.path.isdir(self.model_dir):
+            os.makedirs(self.model_dir)
+        state = self.load_state()
+        if state is None:
+            optimizer = self.prepare_model(training_files, spacy_nlp)
+            state = {'epoch': 0, 'step': 0, 'examples': 0, 'best_score': None}
+        else:
+            keyword_extraction_logger.info('Training is resumed from epoch {0}, step {1}.'.format(
+                state['epoch'] + 1, state['step'] + 1))
+            spacy_nlp = spacy.load(self.checkpoint_name)
+            with open(self.optimizer_name, 'rb') as fp:
+                optimizer = pickle.load(fp)
+        for epoch in range(state['epoch'], self.n_epochs):
+            examples = islice(self.iterate_examples(training_files, spacy_nlp, epoch), state['examples'], None)
+            batch_sizes = islice(compounding(self.batch_start, self.batch_stop, self.batch_compound), state['step'],
+                                 None)
+            losses = dict()
+            with spacy_nlp.select_pipes(enable=['ner']):
+                for batch in minibatch(examples, size=batch_sizes):
+                    spacy_nlp.update(batch, drop=self.dropout, sgd=optimizer, losses=losses)
+                    state['step'] += 1
+                    state['examples'] += len(batch)
+                    if (self.checkpoint_steps is not None) and (state['step'] % self.checkpoint_steps == 0):
+                        self.save_checkpoint(spacy_nlp, optimizer, state)
+                        keyword_extraction_logger.info('Epoch {0}, step {1}: checkpoint has been saved.'.format(
+                            epoch + 1, state['step']))
+            keyword_extraction_logger.info('Epoch {0}: loss is {1:.6}, {2} examples have been used.'.format(
+                epoch + 1, float(losses.get('ner', 0.0)), state['examples']))
+            state['epoch'] = epoch + 1
+            state['examples'] = 0
+            if dev_files is not None:
+                score = self.evaluate(dev_files, spacy_nlp)
+                keyword_extraction_logger.info('Epoch {0}: F1 on the development data is {1:.6}.'.format(
+                    epoch + 1, score))
+                if (state['best_score'] is None) or (score > state['best_score']):
+                    state['best_score'] = score
+                    self.save_model(spacy_nlp, self.best_model_name)
+            self.save_checkpoint(spacy_nlp, optimizer, state)
+        self.save_model(spacy_nlp, self.last_model_name)
+        keyword_extraction_logger.info('The final model has been saved into `{0}`.'.format(self.last_model_name))
+        if (dev_files is None) or (not os.path.isdir(self.best_model_name)):
+            return spacy_nlp
+        return spacy.load(self.best_model_name)
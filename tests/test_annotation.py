@@ -0,0 +1,71 @@
+import codecs
+import json
+import os
+from typing import List
+
+import pytest
+import spacy
+from spacy.language import Language
+
+from keyword_extraction.annotation import KeywordAnnotator
+from keyword_extraction.tokenization import BaseTextPreprocessor
+
+
+KEYWORDS = ['hydraulic_fracturing', 'shale', 'shale gas', 'gas reservoirs', 'bazhenov shale formation', ' ']
+TEXTS = [
+    'Hydraulic fracturing of the Bazhenov shale: the shale gas, and SHALE  GAS reservoirs.',
+    'Nothing to annotate here.',
+    'Gas reservoirs of the Bazhenov shale formation are tight shale gas'
+]
+
+
+class LinesPreprocessor(BaseTextPreprocessor):
+    def get_texts_from_file(self, file_name: str) -> List[str]:
+        with codecs.open(file_name, mode='r', encoding='utf-8') as fp:
+            return list(filter(lambda it: len(it) > 0, map(lambda it: it.strip(), fp)))
+
+
+@pytest.fixture(scope='module')
+def spacy_nlp() -> Language:
+    return spacy.blank('en')
+
+
+def test_keywords_are_found(spacy_nlp):
+    annotator = KeywordAnnotator(KEYWORDS)
+    assert annotator.find_keywords(spacy_nlp(TEXTS[0])) == [(0, 2, 'hydraulic fracturing'), (5, 6, 'shale'),
+                                                            (8, 10, 'shale gas'), (12, 15, 'shale gas')]
+    assert annotator.find_keywords(spacy_nlp(TEXTS[1])) == []
+    assert annotator.find_keywords(spacy_nlp(TEXTS[2])) == [(0, 2, 'gas reservoirs'),
+                                                            (4, 7, 'bazhenov shale formation'),
+                                                            (9, 11, 'shale gas')]
+    assert annotator.find_keywords(spacy_nlp('')) == []
+
+
+def test_span_offsets(tmp_path, spacy_nlp):
+    list_of_files = [os.path.join(str(tmp_path), 'first.txt'), os.path.join(str(tmp_path), 'second.txt')]
+    with codecs.open(list_of_files[0], mode='w', encoding='utf-8') as fp:
+        fp.write('\n'.join(TEXTS[0:2]) + '\n')
+    with codecs.open(list_of_files[1], mode='w', encoding='utf-8') as fp:
+        fp.write(TEXTS[2])
+    annotations_name = os.path.join(str(tmp_path), 'annotations.jsonl')
+    annotator = KeywordAnnotator(KEYWORDS, label='TERM', batch_size=2)
+    assert annotator.annotate_corpus(list_of_files, LinesPreprocessor(), spacy_nlp, annotations_name) == 3
+    assert sorted(os.listdir(str(tmp_path))) == ['annotations.jsonl', 'first.txt', 'second.txt']
+    with codecs.open(annotations_name, mode='r', encoding='utf-8') as fp:
+        annotations = [json.loads(cur_line) for cur_line in fp]
+    assert [it['text'] for it in annotations] == TEXTS
+    assert [it['meta'] for it in annotations] == [{'file': list_of_files[0], 'paragraph': 0},
+                                                  {'file': list_of_files[0], 'paragraph': 1},
+                                                  {'file': list_of_files[1], 'paragraph': 0}]
+    assert annotations[0]['spans'][-1] == {'start': 63, 'end': 73, 'token_start': 12, 'token_end': 14,
+                                           'label': 'TERM', 'keyword': 'shale gas'}
+    assert annotations[2]['spans'][-1] == {'start': 57, 'end': 66, 'token_start': 9, 'token_end': 10,
+                                           'label': 'TERM', 'keyword': 'shale gas'}
+    for cur_annotation in annotations:
+        doc = spacy_nlp(cur_annotation['text'])
+        expected = [(span_start, span_end - 1, doc[span_start:span_end].start_char, doc[span_start:span_end].end_char,
+                     keyword) for span_start, span_end, keyword in annotator.find_keywords(doc)]
+        assert [(it['token_start'], it['token_end'], it['start'], it['end'], it['keyword'])
+                for it in cur_annotation['spans']] == expected
+    assert annotations[0]['text'][63:73] == 'SHALE  GAS'
+    assert len(annotations[1]['spans']) == 0
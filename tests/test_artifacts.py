@@ -0,0 +1,96 @@
+import os
+import time
+
+import pytest
+
+from keyword_extraction.artifacts import ArtifactCache, create_preprocessor, get_preprocessor_name
+from keyword_extraction.tokenization import OilAndGasTextPreprocessr
+
+
+def create_entry(artifacts_cache: ArtifactCache, key: str, size: int, age: float, is_committed: bool=True) -> str:
+    entry_path = artifacts_cache.get_entry_path('stage', artifacts_cache.get_key(key))
+    artifacts_cache.create_entry(entry_path)
+    with open(os.path.join(entry_path, 'data.bin'), 'wb') as fp:
+        fp.write(b'0' * size)
+    if is_committed:
+        artifacts_cache.commit_entry(entry_path)
+    modification_time = time.time() - age
+    for dir_name, _, file_names in os.walk(entry_path):
+        for cur_name in [dir_name] + [os.path.join(dir_name, it) for it in file_names]:
+            os.utime(cur_name, (modification_time, modification_time))
+    return entry_path
+
+
+def test_key_depends_on_inputs_only():
+    assert ArtifactCache.get_key({'b': 1, 'a': [1, 2]}, 'x') == ArtifactCache.get_key({'a': [1, 2], 'b': 1}, 'x')
+    assert ArtifactCache.get_key({'a': [1, 2]}, 'x') != ArtifactCache.get_key({'a': [2, 1]}, 'x')
+    assert ArtifactCache.get_key('x', 'y') != ArtifactCache.get_key('y', 'x')
+
+
+def test_incorrect_parameters(tmp_path):
+    with pytest.raises(ValueError):
+        ArtifactCache('  ')
+    with pytest.raises(ValueError):
+        ArtifactCache(str(tmp_path), max_size=0)
+    with pytest.raises(ValueError):
+        ArtifactCache(str(tmp_path), max_unfinished_age=-1.0)
+
+
+def test_commit_and_invalidate(tmp_path):
+    artifacts_cache = ArtifactCache(os.path.join(str(tmp_path), 'cache'))
+    entry_path = artifacts_cache.get_entry_path('collection', artifacts_cache.get_key('corpus'))
+    assert not artifacts_cache.contains(entry_path)
+    artifacts_cache.create_entry(entry_path)
+    assert not artifacts_cache.contains(entry_path)
+    artifacts_cache.commit_entry(entry_path)
+    assert artifacts_cache.contains(entry_path)
+    artifacts_cache.invalidate_entry(entry_path)
+    assert os.path.isdir(entry_path)
+    assert not artifacts_cache.contains(entry_path)
+    artifacts_cache.invalidate_entry(entry_path)
+    with open(os.path.join(entry_path, 'stale.bin'), 'wb') as fp:
+        fp.write(b'0')
+    artifacts_cache.create_entry(entry_path)
+    assert os.listdir(entry_path) == []
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    artifacts_cache = ArtifactCache(str(tmp_path), max_size=2500)
+    oldest = create_entry(artifacts_cache, 'oldest', 1000, 300.0)
+    protected = create_entry(artifacts_cache, 'protected', 1000, 400.0)
+    used = create_entry(artifacts_cache, 'used', 1000, 200.0)
+    newest = create_entry(artifacts_cache, 'newest', 1000, 100.0)
+    artifacts_cache.touch(used)
+    artifacts_cache.evict([protected])
+    assert not os.path.isdir(oldest)
+    assert not os.path.isdir(newest)
+    assert artifacts_cache.contains(protected)
+    assert artifacts_cache.contains(used)
+
+
+def test_unfinished_entries_are_evicted_only_when_stale(tmp_path):
+    artifacts_cache = ArtifactCache(str(tmp_path), max_size=1500, max_unfinished_age=3600.0)
+    committed = create_entry(artifacts_cache, 'committed', 1000, 100.0)
+    in_progress = create_entry(artifacts_cache, 'in_progress', 1000, 10.0, is_committed=False)
+    abandoned = create_entry(artifacts_cache, 'abandoned', 1000, 7200.0, is_committed=False)
+    artifacts_cache.evict([])
+    assert not os.path.isdir(abandoned)
+    assert not os.path.isdir(committed)
+    assert os.path.isdir(in_progress)
+
+
+def test_unlimited_cache_is_not_evicted(tmp_path):
+    artifacts_cache = ArtifactCache(str(tmp_path))
+    entry_path = create_entry(artifacts_cache, 'entry', 1000, 10000.0)
+    artifacts_cache.evict([])
+    assert artifacts_cache.contains(entry_path)
+
+
+def test_preprocessor_is_created_by_its_name():
+    preprocessor_name = get_preprocessor_name('OilAndGasTextPreprocessr')
+    assert preprocessor_name == 'keyword_extraction.tokenization.OilAndGasTextPreprocessr'
+    assert get_preprocessor_name(preprocessor_name) == preprocessor_name
+    preprocessor = create_preprocessor(preprocessor_name)
+    assert isinstance(preprocessor, OilAndGasTextPreprocessr)
+    assert get_preprocessor_name(preprocessor) == preprocessor_name
+    assert isinstance(create_preprocessor('OilAndGasTextPreprocessr'), OilAndGasTextPreprocessr)
@@ -0,0 +1,69 @@
+import os
+import random
+from typing import List, Tuple
+
+import pytest
+import spacy
+from spacy.language import Language
+
+from keyword_extraction.caching import ParsedDocumentsCache
+from keyword_extraction.keyword_extraction import KeywordExtractor
+from keyword_extraction.tokenization import OilAndGasTextPreprocessr, SpaCyTokenizer
+from tests.test_incremental import TERMS, generate_files
+
+
+def create_nlp(version: str) -> Language:
+    nlp = spacy.blank('en')
+    nlp.meta['version'] = version
+    entity_ruler = nlp.add_pipe('entity_ruler')
+    entity_ruler.add_patterns([{'label': 'TERM', 'pattern': cur_term} for terms in TERMS for cur_term in terms])
+    return nlp
+
+
+def parse(list_of_files: List[str], spacy_nlp: Language, cache_dir: str) -> Tuple[List[tuple], int]:
+    extractor = KeywordExtractor(os.path.join(cache_dir, 'tm'), 2, extract_noun_phrases=False,
+                                 documents_cache_dir=cache_dir)
+    documents_cache = ParsedDocumentsCache(cache_dir, OilAndGasTextPreprocessr(), spacy_nlp)
+    parsed = [(cur_doc.text, [(it.start, it.end, it.label_) for it in cur_doc.ents],
+               SpaCyTokenizer.tokenize_document(cur_doc, False, False))
+              for cur_doc in extractor.parse_corpus(list_of_files, OilAndGasTextPreprocessr(), spacy_nlp,
+                                                    documents_cache)]
+    return parsed, extractor.metrics.counters.get('cached_files', 0)
+
+
+def test_empty_cache_dir():
+    with pytest.raises(ValueError):
+        ParsedDocumentsCache(' ', OilAndGasTextPreprocessr(), spacy.blank('en'))
+
+
+def test_parsed_documents_are_cached(tmp_path):
+    list_of_files = generate_files(os.path.join(str(tmp_path), 'corpus'), 4, random.Random(7))
+    with open(os.path.join(str(tmp_path), 'corpus', 'empty.txt'), mode='w') as fp:
+        fp.write('')
+    list_of_files.append(os.path.join(str(tmp_path), 'corpus', 'empty.txt'))
+    cache_dir = os.path.join(str(tmp_path), 'cache')
+    spacy_nlp = create_nlp('0.0.1')
+    expected, n_cached_files = parse(list_of_files, spacy_nlp, cache_dir)
+    assert len(expected) > 0
+    assert n_cached_files == 0
+    assert len(list(filter(lambda it: it.endswith('.spacy'), os.listdir(cache_dir)))) == len(list_of_files)
+    assert parse(list_of_files, spacy_nlp, cache_dir) == (expected, len(list_of_files))
+    assert parse(list_of_files, create_nlp('0.0.1'), cache_dir) == (expected, len(list_of_files))
+
+
+def test_cache_is_invalidated(tmp_path):
+    list_of_files = generate_files(os.path.join(str(tmp_path), 'corpus'), 3, random.Random(8))
+    cache_dir = os.path.join(str(tmp_path), 'cache')
+    spacy_nlp = create_nlp('0.0.1')
+    expected, _ = parse(list_of_files, spacy_nlp, cache_dir)
+    file_stat = os.stat(list_of_files[0])
+    os.utime(list_of_files[0], ns=(file_stat.st_atime_ns, file_stat.st_mtime_ns + 1000000000))
+    assert parse(list_of_files, spacy_nlp, cache_dir) == (expected, 2)
+    assert parse(list_of_files, spacy_nlp, cache_dir) == (expected, 3)
+    file_stat = os.stat(list_of_files[1])
+    with open(list_of_files[1], mode='a') as fp:
+        fp.write('\n')
+    os.utime(list_of_files[1], ns=(file_stat.st_atime_ns, file_stat.st_mtime_ns))
+    assert parse(list_of_files, spacy_nlp, cache_dir) == (expected, 2)
+    assert parse(list_of_files, create_nlp('0.0.2'), cache_dir) == (expected, 0)
+    assert parse(list_of_files, spacy_nlp, cache_dir) == (expected, 3)
@@ -0,0 +1,183 @@
+import codecs
+import os
+import random
+import uuid
+from typing import Dict, List
+
+import artm
+
+from keyword_extraction.collection import BagOfWordsCollection
+
+
+def generate_documents(n_documents: int, random_generator: random.Random) -> List[List[str]]:
+    vocabulary = ['token_{0}'.format(token_idx) for token_idx in range(50)] + ['нефть', 'газ', 'Well', 'well']
+    return [[random_generator.choice(vocabulary) for _ in range(random_generator.randint(0, 12))]
+            for _ in range(n_documents)]
+
+
+def count_tokens(documents: List[List[str]]) -> List[Dict[str, int]]:
+    counted_documents = []
+    for tokens in documents:
+        token_frequencies = dict()
+        for cur_token in tokens:
+            token_frequencies[cur_token] = token_frequencies.get(cur_token, 0) + 1
+        if len(token_frequencies) > 0:
+            counted_documents.append(token_frequencies)
+    return counted_documents
+
+
+def create_collection(documents: List[List[str]], spill_dir: str,
+                      max_entries_in_memory: int=1000000) -> BagOfWordsCollection:
+    collection = BagOfWordsCollection(spill_dir, max_entries_in_memory)
+    for tokens in documents:
+        collection.add_document(tokens)
+    return collection
+
+
+def get_documents(collection: BagOfWordsCollection) -> List[Dict[str, int]]:
+    return [dict([(collection.vocabulary[token_id], token_count) for token_id, token_count in zip(*cur_document)])
+            for cur_document in collection.iterate_documents()]
+
+
+def save_collection_as_bow_uci_as_before(documents: List[Dict[str, int]], collection_docword_name: str,
+                                         collection_vocab_name: str):
+    global_token_frequencies = dict()
+    for token_frequencies in documents:
+        for cur_token in token_frequencies:
+            global_token_frequencies[cur_token] = global_token_frequencies.get(cur_token, 0) + 1
+    IDs_of_tokens = dict([
+        (token_text, token_idx + 1) for token_idx, token_text in
+        enumerate(sorted(list(global_token_frequencies.keys())))
+    ])
+    with codecs.open(collection_docword_name, mode='w', encoding='utf-8', errors='ignore') as fp:
+        fp.write('{0}\n'.format(len(documents)))
+        fp.write('{0}\n'.format(len(global_token_frequencies)))
+        fp.write('{0}\n'.format(sum([len(token_frequencies) for token_frequencies in documents])))
+        for document_idx in range(len(documents)):
+            for cur_token in documents[document_idx]:
+                fp.write('{0} {1} {2}\n'.format(document_idx + 1, IDs_of_tokens[cur_token],
+                                                documents[document_idx][cur_token]))
+    with codecs.open(collection_vocab_name, mode='w', encoding='utf-8', errors='ignore') as fp:
+        for cur_token in sorted(list(global_token_frequencies.keys())):
+            fp.write('{0}\n'.format(cur_token))
+
+
+def create_batches_as_before(documents: List[Dict[str, int]], batches_path: str,
+                             documents_per_batch: int) -> List[str]:
+    if not os.path.isdir(batches_path):
+        os.makedirs(batches_path)
+    batch_names = []
+    for batch_start in range(0, len(documents), documents_per_batch):
+        batch = artm.messages.Batch()
+        batch.id = str(uuid.uuid4())
+        IDs_of_tokens = dict()
+        for document_idx in range(batch_start, min(batch_start + documents_per_batch, len(documents))):
+            item = batch.item.add()
+            item.id = document_idx + 1
+            for cur_token in documents[document_idx]:
+                token_id = IDs_of_tokens.get(cur_token)
+                if token_id is None:
+                    token_id = len(IDs_of_tokens)
+                    IDs_of_tokens[cur_token] = token_id
+                    batch.token.append(cur_token)
+                    batch.class_id.append('@default_class')
+                item.token_id.append(token_id)
+                item.token_weight.append(float(documents[document_idx][cur_token]))
+        batch_name = batch.id + '.batch'
+        with open(os.path.join(batches_path, batch_name), 'wb') as fp:
+            fp.write(batch.SerializeToString())
+        batch_names.append(batch_name)
+    return batch_names
+
+
+def load_batches(batches_path: str, batch_names: List[str]) -> List[artm.messages.Batch]:
+    batches = []
+    for cur_name in batch_names:
+        batch = artm.messages.Batch()
+        with open(os.path.join(batches_path, cur_name), 'rb') as fp:
+            batch.ParseFromString(fp.read())
+        batch.ClearField('id')
+        batches.append(batch)
+    return batches
+
+
+def test_spilled_documents_are_read_back(tmp_path):
+    documents = generate_documents(100, random.Random(0))
+    with create_collection(documents, str(tmp_path), max_entries_in_memory=7) as collection:
+        assert len(collection.chunk_names) > 1
+        assert all(map(os.path.isfile, collection.chunk_names))
+        assert get_documents(collection) == count_tokens(documents)
+        assert collection.n_documents == len(count_tokens(documents))
+        assert collection.n_entries == sum(map(len, count_tokens(documents)))
+        assert sum(collection.token_frequencies) == sum(map(len, documents))
+        chunks_dir = collection.chunks_dir
+    assert not os.path.isdir(chunks_dir)
+
+
+def test_merged_shards_are_same_as_single_collection(tmp_path):
+    documents = generate_documents(120, random.Random(1))
+    with create_collection(documents, str(tmp_path)) as expected:
+        with create_collection(documents[:50], str(tmp_path), max_entries_in_memory=11) as collection:
+            for shard_start, shard_end in [(50, 51), (51, 90), (90, 120)]:
+                with create_collection(documents[shard_start:shard_end], str(tmp_path), 13) as shard:
+                    collection.merge(shard)
+            assert collection.vocabulary == expected.vocabulary
+            assert list(collection.token_frequencies) == list(expected.token_frequencies)
+            assert collection.n_documents == expected.n_documents
+            assert collection.n_entries == expected.n_entries
+            assert get_documents(collection) == get_documents(expected)
+
+
+def test_vocabulary_is_sorted(tmp_path):
+    with create_collection([['oil', 'gas'], ['well', 'Gas', 'oil'], []], str(tmp_path)) as collection:
+        sorted_vocabulary, new_IDs = collection.sort_vocabulary()
+        assert sorted_vocabulary == sorted(collection.vocabulary)
+        assert [sorted_vocabulary[token_id] for token_id in new_IDs] == collection.vocabulary
+
+
+def test_bow_uci_is_same_as_before(tmp_path):
+    documents = generate_documents(200, random.Random(2))
+    with create_collection(documents, str(tmp_path), max_entries_in_memory=17) as collection:
+        collection.save_as_bow_uci(os.path.join(str(tmp_path), 'docword.new.txt'),
+                                   os.path.join(str(tmp_path), 'vocab.new.txt'))
+    save_collection_as_bow_uci_as_before(count_tokens(documents), os.path.join(str(tmp_path), 'docword.old.txt'),
+                                         os.path.join(str(tmp_path), 'vocab.old.txt'))
+    for file_type in ['docword', 'vocab']:
+        with codecs.open(os.path.join(str(tmp_path), file_type + '.new.txt'), mode='r', encoding='utf-8') as fp:
+            new_content = fp.read()
+        with codecs.open(os.path.join(str(tmp_path), file_type + '.old.txt'), mode='r', encoding='utf-8') as fp:
+            old_content = fp.read()
+        assert new_content == old_content
+
+
+def test_batches_are_same_as_before(tmp_path):
+    documents = generate_documents(95, random.Random(3))
+    new_batches_path = os.path.join(str(tmp_path), 'new_batches')
+    old_batches_path = os.path.join(str(tmp_path), 'old_batches')
+    with create_collection(documents, str(tmp_path), max_entries_in_memory=19) as collection:
+        new_batch_names = collection.create_batches(new_batches_path, 10)
+    old_batch_names = create_batches_as_before(count_tokens(documents), old_batches_path, 10)
+    assert len(new_batch_names) == len(old_batch_names) == 9
+    assert sorted(os.listdir(new_batches_path)) == sorted(new_batch_names)
+    assert load_batches(new_batches_path, new_batch_names) == load_batches(old_batches_path, old_batch_names)
+
+
+def test_batch_names_are_deterministic(tmp_path):
+    documents = generate_documents(45, random.Random(4))
+    contents = []
+    for attempt_idx in range(2):
+        batches_path = os.path.join(str(tmp_path), 'batches_{0}'.format(attempt_idx))
+        with create_collection(documents, str(tmp_path), max_entries_in_memory=23) as collection:
+            batch_names = collection.create_batches(batches_path, 10)
+        contents.append([])
+        for cur_name in batch_names:
+            with open(os.path.join(batches_path, cur_name), 'rb') as fp:
+                contents[-1].append((cur_name, fp.read()))
+    assert contents[0] == contents[1]
+    assert [cur_name.split('_')[0] for cur_name, _ in contents[0]] == ['000000', '000001', '000002', '000003',
+                                                                         '000004']
+    assert len(set([cur_name.split('_')[1] for cur_name, _ in contents[0]])) == 5
+    with create_collection(documents[:10], str(tmp_path)) as collection:
+        batch_names = collection.create_batches(os.path.join(str(tmp_path), 'batches_0'), 10, 5)
+    assert batch_names[0].startswith('000005_')
+    assert batch_names[0] != contents[0][0][0]
@@ -0,0 +1,136 @@
+import codecs
+import os
+import random
+from typing import List, Union
+
+import pytest
+import spacy
+from spacy.language import Language
+
+from keyword_extraction.artifacts import get_preprocessor_name, get_spacy_model_name
+from keyword_extraction.keyword_extraction import KeywordExtractor
+from keyword_extraction.tokenization import OilAndGasTextPreprocessr
+
+
+TERMS = [['crude oil', 'drilling rig', 'well bore', 'mud pump', 'casing string'],
+         ['natural gas', 'gas pipeline', 'compressor station', 'gas condensate', 'flare stack'],
+         ['seismic survey', 'reservoir model', 'porosity log', 'fault block', 'core sample']]
+STOP_WORDS = ['the', 'a', 'of', 'in', 'and', 'to', 'is', 'with', 'for', 'on']
+
+
+@pytest.fixture(scope='module')
+def spacy_nlp() -> Language:
+    nlp = spacy.blank('en')
+    entity_ruler = nlp.add_pipe('entity_ruler')
+    entity_ruler.add_patterns([{'label': 'TERM', 'pattern': cur_term} for terms in TERMS for cur_term in terms])
+    return nlp
+
+
+def generate_files(corpus_dir: str, n_files: int, random_generator: random.Random,
+                   terms_of_topics: Union[List[List[str]], None]=None) -> List[str]:
+    if not os.path.isdir(corpus_dir):
+        os.makedirs(corpus_dir)
+    list_of_files = []
+    for file_idx in range(n_files):
+        file_name = os.path.join(corpus_dir, 'text_{0:03}.txt'.format(file_idx))
+        with codecs.open(file_name, mode='w', encoding='utf-8') as fp:
+            for _ in range(3):
+                terms = random_generator.choice(TERMS if terms_of_topics is None else terms_of_topics)
+                for _ in range(4):
+                    words = []
+                    while sum(map(len, words)) < 60:
+                        words.append(random_generator.choice(terms if random_generator.random() < 0.4 else STOP_WORDS))
+                    fp.write(' '.join(words) + '.\n')
+                fp.write('\n')
+        list_of_files.append(file_name)
+    return list_of_files
+
+
+def create_extractor(model_dir: str, number_of_topics: int) -> KeywordExtractor:
+    return KeywordExtractor(os.path.join(model_dir, 'tm'), number_of_topics, extract_noun_phrases=False,
+                            incremental=True, documents_per_batch=2, max_passes=3)
+
+
+def get_entries(extractor: KeywordExtractor, list_of_files: List[str], spacy_nlp: Language):
+    _, dir_name, base_name = extractor.check_topic_model_name()
+    artifacts_cache = extractor.create_artifacts_cache(dir_name, base_name)
+    collection_key = extractor.get_collection_key(artifacts_cache, list_of_files,
+                                                  get_preprocessor_name(OilAndGasTextPreprocessr()),
+                                                  get_spacy_model_name(spacy_nlp))
+    collection_path = artifacts_cache.get_entry_path('collection', collection_key)
+    return artifacts_cache, collection_path, extractor.get_model_path(artifacts_cache, collection_key)
+
+
+def get_consumed_batches(model_path: str) -> List[str]:
+    return KeywordExtractor.load_consumed_batches(os.path.join(model_path, 'topic_model'))
+
+
+def test_only_new_files_are_added(tmp_path, spacy_nlp):
+    list_of_files = generate_files(os.path.join(str(tmp_path), 'corpus'), 5, random.Random(0))
+    extractor = create_extractor(str(tmp_path), 2)
+    artifacts_cache, collection_path, model_path = get_entries(extractor, list_of_files, spacy_nlp)
+    batches_path = os.path.join(collection_path, 'batches')
+    manifest_name = os.path.join(collection_path, 'collection.manifest')
+    extractor.select_from_corpus(list_of_files[:3], OilAndGasTextPreprocessr(), spacy_nlp)
+    initial_batches = KeywordExtractor.list_batches(batches_path)
+    assert len(initial_batches) > 0
+    assert sorted(KeywordExtractor.load_manifest(manifest_name).keys()) == \
+        sorted(map(os.path.abspath, list_of_files[:3]))
+    assert get_consumed_batches(model_path) == initial_batches
+    extractor.select_from_corpus(list_of_files[:3], OilAndGasTextPreprocessr(), spacy_nlp)
+    assert KeywordExtractor.list_batches(batches_path) == initial_batches
+    extractor.select_from_corpus(list_of_files, OilAndGasTextPreprocessr(), spacy_nlp)
+    all_batches = KeywordExtractor.list_batches(batches_path)
+    assert set(initial_batches) < set(all_batches)
+    assert sorted(KeywordExtractor.load_manifest(manifest_name).keys()) == sorted(map(os.path.abspath, list_of_files))
+    assert get_consumed_batches(model_path) == all_batches
+    assert artifacts_cache.contains(collection_path)
+    assert artifacts_cache.contains(model_path)
+
+
+def test_model_with_other_number_of_topics_is_updated(tmp_path, spacy_nlp):
+    list_of_files = generate_files(os.path.join(str(tmp_path), 'corpus'), 5, random.Random(1))
+    first_extractor = create_extractor(str(tmp_path), 2)
+    second_extractor = create_extractor(str(tmp_path), 3)
+    _, collection_path, first_model_path = get_entries(first_extractor, list_of_files, spacy_nlp)
+    _, _, second_model_path = get_entries(second_extractor, list_of_files, spacy_nlp)
+    assert first_model_path != second_model_path
+    batches_path = os.path.join(collection_path, 'batches')
+    first_extractor.select_from_corpus(list_of_files[:3], OilAndGasTextPreprocessr(), spacy_nlp)
+    initial_batches = KeywordExtractor.list_batches(batches_path)
+    second_extractor.select_from_corpus(list_of_files, OilAndGasTextPreprocessr(), spacy_nlp)
+    all_batches = KeywordExtractor.list_batches(batches_path)
+    assert get_consumed_batches(second_model_path) == all_batches
+    assert get_consumed_batches(first_model_path) == initial_batches
+    first_extractor.select_from_corpus(list_of_files, OilAndGasTextPreprocessr(), spacy_nlp)
+    assert KeywordExtractor.list_batches(batches_path) == all_batches
+    assert get_consumed_batches(first_model_path) == all_batches
+
+
+def test_model_is_trained_again_after_rebuilding_of_collection(tmp_path, spacy_nlp):
+    list_of_files = generate_files(os.path.join(str(tmp_path), 'corpus'), 4, random.Random(2))
+    extractor = create_extractor(str(tmp_path), 2)
+    artifacts_cache, collection_path, model_path = get_entries(extractor, list_of_files, spacy_nlp)
+    batches_path = os.path.join(collection_path, 'batches')
+    extractor.select_from_corpus(list_of_files[:2], OilAndGasTextPreprocessr(), spacy_nlp)
+    initial_batches = KeywordExtractor.list_batches(batches_path)
+    artifacts_cache.invalidate_entry(collection_path)
+    extractor.select_from_corpus(list_of_files[2:], OilAndGasTextPreprocessr(), spacy_nlp)
+    all_batches = KeywordExtractor.list_batches(batches_path)
+    assert len(set(all_batches) & set(initial_batches)) == 0
+    assert get_consumed_batches(model_path) == all_batches
+    assert artifacts_cache.contains(model_path)
+
+
+def test_terms_of_new_files_are_selected(tmp_path, spacy_nlp, monkeypatch):
+    monkeypatch.setattr(KeywordExtractor, 'regularizer_taus',
+                        dict(KeywordExtractor.regularizer_taus, decorrelator_phi_regularizer=0.0))
+    list_of_files = generate_files(os.path.join(str(tmp_path), 'corpus'), 4, random.Random(0), TERMS[:2])
+    new_files = generate_files(os.path.join(str(tmp_path), 'new_corpus'), 4, random.Random(1), TERMS[2:])
+    extractor = create_extractor(str(tmp_path), 2)
+    keywords, _ = extractor.select_from_corpus(list_of_files, OilAndGasTextPreprocessr(), spacy_nlp)
+    new_keywords = set(TERMS[2])
+    assert len(keywords) > 0
+    assert len(new_keywords & set(keywords)) == 0
+    keywords, _ = extractor.select_from_corpus(list_of_files + new_files, OilAndGasTextPreprocessr(), spacy_nlp)
+    assert len(new_keywords & set(keywords)) > 0
@@ -0,0 +1,78 @@
+import logging
+import os
+
+import pytest
+
+from keyword_extraction.instrumentation import PipelineMetrics, get_current_rss, get_size_of_path
+
+
+def test_incorrect_report_interval():
+    with pytest.raises(ValueError):
+        PipelineMetrics(report_interval=0.0)
+
+
+def test_stage_rss_is_measured_around_stage():
+    metrics = PipelineMetrics()
+    with metrics.measure('allocation'):
+        data = bytearray(64 * 1024 * 1024)
+        for idx in range(0, len(data), 4096):
+            data[idx] = 1
+    with metrics.measure('allocation'):
+        pass
+    del data
+    stage = metrics.stages['allocation']
+    assert stage['calls'] == 2
+    assert stage['seconds'] > 0.0
+    if get_current_rss() is not None:
+        assert stage['rss_after_bytes'] - stage['rss_before_bytes'] >= 32 * 1024 * 1024
+        assert stage['max_rss_growth_bytes'] >= 32 * 1024 * 1024
+
+
+def test_metrics_of_workers_are_merged():
+    metrics = PipelineMetrics()
+    metrics.add_time('tokenization', 1.5)
+    metrics.increment('files', 2)
+    worker_metrics = PipelineMetrics()
+    worker_metrics.add_time('tokenization', 2.0, 100, 300)
+    worker_metrics.add_time('parsing', 1.0, 200, 250)
+    worker_metrics.increment('files', 3)
+    worker_metrics.set_counter('tokens', 10)
+    metrics.merge(worker_metrics)
+    assert metrics.stages['tokenization'] == {'seconds': 3.5, 'calls': 2, 'rss_before_bytes': 100,
+                                              'rss_after_bytes': 300, 'max_rss_growth_bytes': 200}
+    assert metrics.stages['parsing']['max_rss_growth_bytes'] == 50
+    assert metrics.counters == {'files': 5, 'tokens': 10}
+    report = metrics.to_dict()
+    assert sorted(report.keys()) == ['counters', 'process_peak_rss_bytes', 'stages', 'total_seconds']
+    assert report['process_peak_rss_bytes'] > 0
+
+
+def test_progress_is_reported(caplog):
+    metrics = PipelineMetrics(report_interval=3600.0)
+    metrics.start_progress('Ingestion', 3, 3 * 1024 * 1024)
+    with caplog.at_level(logging.INFO, logger='keyword_extraction.instrumentation'):
+        metrics.advance_progress(1024 * 1024)
+        metrics.advance_progress(1024 * 1024)
+        assert len(caplog.records) == 0
+        metrics.advance_progress(1024 * 1024)
+    assert len(caplog.records) == 1
+    assert caplog.records[0].getMessage().startswith('Ingestion: 3 of 3 files (100.0%), ')
+    assert caplog.records[0].getMessage().endswith('ETA 0:00:00.')
+    caplog.clear()
+    metrics = PipelineMetrics(report_interval=1e-9)
+    metrics.start_progress('Ingestion', 4, 4000)
+    with caplog.at_level(logging.INFO, logger='keyword_extraction.instrumentation'):
+        metrics.advance_progress(1000)
+    assert len(caplog.records) == 1
+    assert caplog.records[0].getMessage().startswith('Ingestion: 1 of 4 files (25.0%), ')
+
+
+def test_size_of_path(tmp_path):
+    os.makedirs(os.path.join(str(tmp_path), 'nested'))
+    with open(os.path.join(str(tmp_path), 'first.bin'), 'wb') as fp:
+        fp.write(b'0' * 10)
+    with open(os.path.join(str(tmp_path), 'nested', 'second.bin'), 'wb') as fp:
+        fp.write(b'0' * 15)
+    assert get_size_of_path(str(tmp_path)) == 25
+    assert get_size_of_path(os.path.join(str(tmp_path), 'first.bin')) == 10
+    assert get_size_of_path(os.path.join(str(tmp_path), 'missing')) == 0
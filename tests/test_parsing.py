@@ -0,0 +1,54 @@
+import os
+import random
+from typing import List
+
+import pytest
+import spacy
+from spacy.language import Language
+
+from keyword_extraction.keyword_extraction import KeywordExtractor
+from keyword_extraction.tokenization import OilAndGasTextPreprocessr, SpaCyTokenizer
+from tests.test_incremental import TERMS, generate_files
+
+
+@pytest.fixture(scope='module')
+def spacy_nlp() -> Language:
+    nlp = spacy.blank('en')
+    entity_ruler = nlp.add_pipe('entity_ruler')
+    entity_ruler.add_patterns([{'label': 'TERM', 'pattern': cur_term} for terms in TERMS for cur_term in terms])
+    return nlp
+
+
+def create_corpus(corpus_dir: str) -> List[str]:
+    list_of_files = generate_files(corpus_dir, 5, random.Random(6))
+    for empty_name in [os.path.join(corpus_dir, 'empty_{0}.txt'.format(idx)) for idx in range(2)]:
+        with open(empty_name, mode='w') as fp:
+            fp.write('')
+        list_of_files.append(empty_name)
+    return [list_of_files[5]] + list_of_files[:2] + [list_of_files[6]] + list_of_files[2:5]
+
+
+def parse_corpus_as_before(list_of_files: List[str], spacy_nlp: Language) -> List[str]:
+    preprocessor = OilAndGasTextPreprocessr()
+    parsed = []
+    for cur_name in list_of_files:
+        for cur_text in preprocessor.get_texts_from_file(cur_name):
+            cur_doc = spacy_nlp(cur_text)
+            parsed.append((cur_doc.text, [(it.start, it.end, it.label_) for it in cur_doc.ents],
+                           SpaCyTokenizer.tokenize_document(cur_doc, False, False)))
+    return parsed
+
+
+@pytest.mark.parametrize('batch_size,n_process', [(1000, 1), (2, 1), (3, 2)])
+def test_batched_parsing_is_same_as_before(tmp_path, spacy_nlp, batch_size: int, n_process: int):
+    list_of_files = create_corpus(os.path.join(str(tmp_path), 'corpus'))
+    extractor = KeywordExtractor(os.path.join(str(tmp_path), 'tm'), 2, extract_noun_phrases=False,
+                                 batch_size=batch_size, n_process=n_process)
+    parsed = [(cur_doc.text, [(it.start, it.end, it.label_) for it in cur_doc.ents],
+               SpaCyTokenizer.tokenize_document(cur_doc, False, False))
+              for cur_doc in extractor.parse_corpus(list_of_files, OilAndGasTextPreprocessr(), spacy_nlp)]
+    expected = parse_corpus_as_before(list_of_files, spacy_nlp)
+    assert len(expected) > 0
+    assert parsed == expected
+    assert extractor.metrics.counters['files'] == len(list_of_files)
+    assert extractor.metrics.counters['bytes_read'] == sum(map(os.path.getsize, list_of_files))
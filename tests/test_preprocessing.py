@@ -0,0 +1,97 @@
+import codecs
+import os
+import random
+import re
+from typing import List
+
+from keyword_extraction.tokenization import OilAndGasTextPreprocessr
+
+
+RE_FOR_SPACE = re.compile('[\u00A0\u2003\u2002\u2004\u2005\u2006\u2009\u200A\u0000\r\n\t]+', re.U)
+
+
+def tokenize_source_text_as_before(source_text: str) -> str:
+    re_for_tokenization = [re.compile(r'\w:\d', re.U), re.compile(r'\d%\w', re.U), re.compile(r'\w[\\/]\w', re.U),
+                           re.compile(r'.\w[\\/]', re.U), re.compile(r'\w\+\w', re.U), re.compile(r'.\w\+\S', re.U)]
+    tokenized = source_text.replace('&quot;', '"').replace('&gt;', '>').replace('&lt;', '<')
+    for cur_re in re_for_tokenization:
+        search_res = cur_re.search(tokenized)
+        while search_res is not None:
+            tokenized = tokenized[:(search_res.start() + 2)] + ' ' + tokenized[(search_res.start() + 2):]
+            search_res = cur_re.search(tokenized, pos=search_res.end() + 1)
+    return tokenized
+
+
+def get_texts_from_file_as_before(preprocessor: OilAndGasTextPreprocessr, file_name: str) -> List[str]:
+    re_for_unicode = re.compile(r'&#\d+;')
+    all_texts = []
+    lines_of_text = []
+    with codecs.open(file_name, mode='r', encoding='utf-8', errors='ignore') as fp:
+        cur_line = fp.readline()
+        while len(cur_line) > 0:
+            prep_line = cur_line.strip()
+            if len(prep_line) > 0:
+                prep_line = tokenize_source_text_as_before(prep_line).strip()
+                if len(prep_line) > 0:
+                    prep_line = RE_FOR_SPACE.sub(' ', prep_line).strip()
+                    if len(prep_line) > 0:
+                        search_res = re_for_unicode.search(prep_line)
+                        while search_res is not None:
+                            unicode_value = int(prep_line[(search_res.start() + 2):(search_res.end() - 1)])
+                            prep_line = prep_line[:search_res.start()] + chr(unicode_value) + \
+                                prep_line[search_res.end():]
+                            search_res = re_for_unicode.search(prep_line)
+                    if len(prep_line) > 0:
+                        lines_of_text.append(prep_line)
+            else:
+                if len(lines_of_text) > 0:
+                    if all(map(lambda it: len(it) >= preprocessor.min_characters_in_line, lines_of_text)):
+                        new_text = lines_of_text[0]
+                        for new_line in lines_of_text[1:]:
+                            if new_text.endswith('-') and (not new_text[-2].isspace()):
+                                new_text += new_line
+                            else:
+                                new_text += (' ' + new_line)
+                        if len(new_text) >= preprocessor.min_characters_in_text:
+                            all_texts.append(new_text)
+                lines_of_text.clear()
+            cur_line = fp.readline()
+    return all_texts
+
+
+def generate_random_text(generator: random.Random) -> str:
+    fragments = ['well', 'Oil', 'gas', '12', '5%', 'km', 'a:1', 'b/c', 'C+H', 'x\\y', '+5', '%d', 'z+', 'drill-',
+                 '&quot;', '&gt;', '&lt;', '&#65;', '&#38;#66;', '&#0;', '&#10;', ' ', ' ', ' ', '\t', '\u00A0',
+                 '\u2003', '\u0000', '-', '--', '\n', '\n', '\n\n', '\r\n', '\r', '\r\n\r\n', '\u2028', '\x0c',
+                 '\u0085', ' \n ', '\n\t\n']
+    return ''.join(generator.choice(fragments) for _ in range(generator.randint(0, 300)))
+
+
+def test_paragraphs_are_same_as_before(tmp_path):
+    generator = random.Random(42)
+    preprocessor = OilAndGasTextPreprocessr()
+    file_name = os.path.join(str(tmp_path), 'text.txt')
+    n_paragraphs = 0
+    for _ in range(1000):
+        preprocessor.min_characters_in_line = generator.randint(2, 20)
+        preprocessor.min_characters_in_text = generator.randint(1, 200)
+        preprocessor.max_characters_in_block = generator.choice([1, 5, 30, 1 << 20])
+        source_text = generate_random_text(generator)
+        with open(file_name, mode='wb') as fp:
+            fp.write(source_text.encode('utf-8') + generator.choice([b'', b'\n\n', b'\xff\n\n']))
+        expected = get_texts_from_file_as_before(preprocessor, file_name)
+        assert preprocessor.get_texts_from_file(file_name) == expected, repr(source_text)
+        n_paragraphs += len(expected)
+    assert n_paragraphs > 0
+
+
+def test_hyphenated_lines_are_joined(tmp_path):
+    preprocessor = OilAndGasTextPreprocessr()
+    preprocessor.min_characters_in_text = 20
+    file_name = os.path.join(str(tmp_path), 'text.txt')
+    with codecs.open(file_name, mode='w', encoding='utf-8') as fp:
+        fp.write('The drilling of the horizontal well-\nbore has been finished\n'
+                 'with the total depth of 3500 m.\n\nThis paragraph is not finished by a blank line\n')
+    assert preprocessor.get_texts_from_file(file_name) == [
+        'The drilling of the horizontal well-bore has been finished with the total depth of 3500 m.'
+    ]
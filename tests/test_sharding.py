@@ -0,0 +1,47 @@
+import os
+import random
+from typing import List, Tuple
+
+import pytest
+import spacy
+from spacy.language import Language
+
+from keyword_extraction.keyword_extraction import KeywordExtractor
+from keyword_extraction.tokenization import OilAndGasTextPreprocessr
+from tests.test_incremental import TERMS, generate_files
+
+
+@pytest.fixture(scope='module')
+def spacy_nlp() -> Language:
+    nlp = spacy.blank('en')
+    entity_ruler = nlp.add_pipe('entity_ruler')
+    entity_ruler.add_patterns([{'label': 'TERM', 'pattern': cur_term} for terms in TERMS for cur_term in terms])
+    return nlp
+
+
+def ingest(list_of_files: List[str], spacy_nlp: Language, work_dir: str,
+           n_shards: int) -> Tuple[List[str], list, List[Tuple[str, bytes]]]:
+    extractor = KeywordExtractor(os.path.join(work_dir, 'tm'), 2, extract_noun_phrases=False, documents_per_batch=2,
+                                 n_shards=n_shards)
+    batches_path = os.path.join(work_dir, 'batches')
+    os.makedirs(work_dir)
+    with extractor.create_collection(list_of_files, OilAndGasTextPreprocessr(), spacy_nlp, work_dir) as collection:
+        vocabulary = list(collection.vocabulary)
+        documents = [(list(token_IDs), list(token_counts)) for token_IDs, token_counts in
+                     collection.iterate_documents()]
+        batch_names = collection.create_batches(batches_path, extractor.documents_per_batch)
+    batches = []
+    for cur_name in batch_names:
+        with open(os.path.join(batches_path, cur_name), 'rb') as fp:
+            batches.append((cur_name, fp.read()))
+    assert sorted(os.listdir(batches_path)) == batch_names
+    return vocabulary, documents, batches
+
+
+def test_shards_give_same_collection_and_batches(tmp_path, spacy_nlp):
+    list_of_files = generate_files(os.path.join(str(tmp_path), 'corpus'), 7, random.Random(5))
+    vocabulary, documents, batches = ingest(list_of_files, spacy_nlp, os.path.join(str(tmp_path), 'single'), 1)
+    assert len(batches) > 1
+    for n_shards in (2, 3):
+        assert ingest(list_of_files, spacy_nlp, os.path.join(str(tmp_path), 'sharded_{0}'.format(n_shards)),
+                      n_shards) == (vocabulary, documents, batches)
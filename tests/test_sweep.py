@@ -0,0 +1,59 @@
+import codecs
+import glob
+import json
+import os
+import random
+import sys
+from typing import List
+
+import spacy
+
+import console
+from tests.test_incremental import TERMS, generate_files
+
+
+def run_console(monkeypatch, arguments: List[str]):
+    monkeypatch.setattr(sys, 'argv', ['console.py'] + arguments)
+    console.main()
+
+
+def load_lines(file_name: str) -> List[str]:
+    with codecs.open(file_name, mode='r', encoding='utf-8') as fp:
+        return [cur_line.rstrip('\n') for cur_line in fp]
+
+
+def test_sweep_summary_is_same_as_individual_runs(tmp_path, monkeypatch):
+    corpus_dir = os.path.join(str(tmp_path), 'corpus')
+    generate_files(corpus_dir, 200, random.Random(4))
+    spacy_dir = os.path.join(str(tmp_path), 'spacy_model')
+    spacy_nlp = spacy.blank('en')
+    entity_ruler = spacy_nlp.add_pipe('entity_ruler')
+    entity_ruler.add_patterns([{'label': 'TERM', 'pattern': cur_term} for terms in TERMS for cur_term in terms])
+    spacy_nlp.to_disk(spacy_dir)
+    sweep_dir = os.path.join(str(tmp_path), 'sweep')
+    run_console(monkeypatch, ['sweep', '-s', corpus_dir, '-d', sweep_dir, '-n', os.path.join(sweep_dir, 'tm'),
+                              '-p', 'OilAndGasTextPreprocessr', '--spacy', spacy_dir, '--topics', '3', '2',
+                              '--probability', '0.2', '0.01', '--max-passes', '5', '--sweep-workers', '2'])
+    summary = [cur_line.split('\t') for cur_line in load_lines(os.path.join(sweep_dir, 'summary.tsv'))]
+    assert summary[0] == ['topics', 'probability', 'perplexity', 'sparsity_phi', 'sparsity_theta', 'keywords',
+                          'file']
+    assert [tuple(it[0:2]) for it in summary[1:]] == [('2', '0.01'), ('2', '0.2'), ('3', '0.01'), ('3', '0.2')]
+    for n_topics, probability_threshold, perplexity, sparsity_phi, sparsity_theta, n_keywords, file_name in \
+            summary[1:]:
+        run_dir = os.path.join(str(tmp_path), 'run_{0}_{1}'.format(n_topics, probability_threshold))
+        os.makedirs(run_dir)
+        run_console(monkeypatch, ['keywords', '-s', corpus_dir, '-d', os.path.join(run_dir, 'keywords.txt'),
+                                  '-n', os.path.join(run_dir, 'tm'), '-p', 'OilAndGasTextPreprocessr',
+                                  '--spacy', spacy_dir, '--topics', n_topics, '--probability', probability_threshold,
+                                  '--max-passes', '5'])
+        keywords = load_lines(os.path.join(run_dir, 'keywords.txt'))
+        assert load_lines(os.path.join(sweep_dir, file_name)) == keywords
+        assert int(n_keywords) == len(keywords)
+        scores_names = glob.glob(os.path.join(run_dir, 'tm.artifacts', '**', '*.scores'), recursive=True)
+        assert len(scores_names) == 1
+        with codecs.open(scores_names[0], mode='r', encoding='utf-8') as fp:
+            scores = json.load(fp)
+        assert [perplexity, sparsity_phi, sparsity_theta] == [
+            '{0:.6f}'.format(scores[score_name])
+            for score_name in ['perplexity_score', 'sparsity_phi_score', 'sparsity_theta_score']
+        ]
@@ -0,0 +1,166 @@
+import random
+from typing import List, Tuple, Union
+
+import pytest
+import spacy
+from spacy.tokens.doc import Doc
+
+from keyword_extraction.tokenization import SpaCyTokenizer
+
+
+def create_doc(words: List[str], pos: List[str], deps: List[str], ents: List[str],
+               noun_chunks: Union[List[Tuple[int, int]], None]=None) -> Doc:
+    vocab = spacy.blank('en').vocab
+    if noun_chunks is not None:
+        label = vocab.strings.add('NP')
+        vocab.get_noun_chunks = lambda doclike: [(start, end, label) for start, end in noun_chunks]
+    heads = [(deps.index('ROOT') if 'ROOT' in deps else 0) for _ in words]
+    return Doc(vocab, words=words, spaces=[(not it.isspace()) for it in words], pos=pos, deps=deps, heads=heads,
+               ents=ents)
+
+
+def tokenize_document_as_before(doc: Doc, select_noun_phrases: bool, select_verbs: bool) -> str:
+    n_tokens = len(doc)
+    used_words = [False for _ in range(n_tokens)]
+    selected_phrases = list()
+    ne_start_idx = -1
+    for token_idx in range(n_tokens):
+        if doc[token_idx].ent_iob_ == 'B':
+            if ne_start_idx >= 0:
+                can_add = True
+                for token_idx_2 in range(ne_start_idx, token_idx):
+                    if used_words[token_idx_2]:
+                        can_add = False
+                        break
+                if can_add:
+                    phrase_bounds = SpaCyTokenizer.strip_noun_phrase(doc, ne_start_idx, token_idx)
+                    if (phrase_bounds[0] >= 0) and (phrase_bounds[1] >= 0):
+                        for token_idx in range(phrase_bounds[0], phrase_bounds[1]):
+                            used_words[token_idx] = True
+                        selected_phrases.append(phrase_bounds)
+            ne_start_idx = token_idx
+        elif doc[token_idx].ent_iob_ != 'I':
+            if ne_start_idx >= 0:
+                can_add = True
+                for token_idx_2 in range(ne_start_idx, token_idx):
+                    if used_words[token_idx_2]:
+                        can_add = False
+                        break
+                if can_add:
+                    phrase_bounds = SpaCyTokenizer.strip_noun_phrase(doc, ne_start_idx, token_idx)
+                    if (phrase_bounds[0] >= 0) and (phrase_bounds[1] >= 0):
+                        for token_idx in range(phrase_bounds[0], phrase_bounds[1]):
+                            used_words[token_idx] = True
+                        selected_phrases.append(phrase_bounds)
+            ne_start_idx = -1
+    if ne_start_idx >= 0:
+        can_add = True
+        for token_idx_2 in range(ne_start_idx, n_tokens):
+            if used_words[token_idx_2]:
+                can_add = False
+                break
+        if can_add:
+            phrase_bounds = SpaCyTokenizer.strip_noun_phrase(doc, ne_start_idx, n_tokens)
+            if (phrase_bounds[0] >= 0) and (phrase_bounds[1] >= 0):
+                for token_idx in range(phrase_bounds[0], phrase_bounds[1]):
+                    used_words[token_idx] = True
+                selected_phrases.append(phrase_bounds)
+    if select_noun_phrases:
+        for cur_phrase in doc.noun_chunks:
+            phrase_bounds = SpaCyTokenizer.strip_noun_phrase(doc, cur_phrase.start, cur_phrase.end)
+            if (phrase_bounds[0] >= 0) and (phrase_bounds[1] >= 0):
+                can_add = True
+                for token_idx_2 in range(phrase_bounds[0], phrase_bounds[1]):
+                    if used_words[token_idx_2]:
+                        can_add = False
+                        break
+                if can_add:
+                    selected_phrases.append(phrase_bounds)
+                    for token_idx in range(phrase_bounds[0], phrase_bounds[1]):
+                        used_words[token_idx] = True
+    if select_verbs:
+        for token_idx in range(n_tokens):
+            if doc[token_idx].dep == 'ROOT':
+                if not used_words[token_idx]:
+                    used_words[token_idx] = True
+                    selected_phrases.append((token_idx, token_idx + 1))
+    selected_phrases.sort()
+    return ' '.join(filter(lambda it2: len(it2) > 0, map(lambda it1: SpaCyTokenizer.get_text_of_noun_phrase(
+        doc, it1[0], it1[1]), selected_phrases)))
+
+
+def test_punctuation_and_spaces_are_stripped_from_entities():
+    doc = create_doc(
+        words=['(', 'Gazprom', 'Neft', ')', 'drilled', 'in', 'Western', 'Siberia', '\n', '.'],
+        pos=['PUNCT', 'PROPN', 'PROPN', 'PUNCT', 'VERB', 'ADP', 'PROPN', 'PROPN', 'SPACE', 'PUNCT'],
+        deps=['punct', 'nsubj', 'nsubj', 'punct', 'ROOT', 'prep', 'pobj', 'pobj', 'dep', 'punct'],
+        ents=['B-ORG', 'I-ORG', 'I-ORG', 'I-ORG', 'O', 'B-LOC', 'I-LOC', 'I-LOC', 'I-LOC', 'O']
+    )
+    assert SpaCyTokenizer.tokenize_document(doc, False, False) == 'gazprom_neft western_siberia'
+    assert SpaCyTokenizer.tokenize_document(doc, False, False) == tokenize_document_as_before(doc, False, False)
+
+
+def test_overlapping_noun_chunks_are_selected_once():
+    doc = create_doc(
+        words=['Rosneft', 'drilled', 'the', 'new', 'horizontal', 'wells', 'of', 'the', 'field', '.'],
+        pos=['PROPN', 'VERB', 'DET', 'ADJ', 'ADJ', 'NOUN', 'ADP', 'DET', 'NOUN', 'PUNCT'],
+        deps=['nsubj', 'ROOT', 'det', 'amod', 'amod', 'dobj', 'prep', 'det', 'pobj', 'punct'],
+        ents=['B-ORG', 'O', 'O', 'O', 'O', 'O', 'O', 'O', 'O', 'O'],
+        noun_chunks=[(0, 1), (2, 6), (4, 10), (7, 9)]
+    )
+    assert SpaCyTokenizer.tokenize_document(doc, True, False) == 'rosneft new_horizontal_wells field'
+    assert SpaCyTokenizer.tokenize_document(doc, True, False) == tokenize_document_as_before(doc, True, False)
+
+
+def test_root_verbs_are_selected_outside_of_phrases():
+    doc = create_doc(
+        words=['Rosneft', 'drilled', 'the', 'new', 'wells', '.'],
+        pos=['PROPN', 'VERB', 'DET', 'ADJ', 'NOUN', 'PUNCT'],
+        deps=['nsubj', 'ROOT', 'det', 'amod', 'dobj', 'punct'],
+        ents=['B-ORG', 'O', 'O', 'O', 'O', 'O'],
+        noun_chunks=[(2, 5)]
+    )
+    assert SpaCyTokenizer.tokenize_document(doc, False, True) == 'rosneft drilled'
+    assert SpaCyTokenizer.tokenize_document(doc, True, True) == 'rosneft drilled new_wells'
+    inside_entity = create_doc(
+        words=['Gazprom', 'Neft', 'reports'], pos=['PROPN', 'VERB', 'NOUN'], deps=['nsubj', 'ROOT', 'dobj'],
+        ents=['B-ORG', 'I-ORG', 'O']
+    )
+    assert SpaCyTokenizer.tokenize_document(inside_entity, False, True) == 'gazprom_neft'
+    assert tokenize_document_as_before(doc, False, True) == 'rosneft'
+
+
+def test_adjacent_entities_are_selected_separately():
+    doc = create_doc(
+        words=['Gazprom', 'Neft', 'Surgut', 'field', 'Rosneft', '.'],
+        pos=['PROPN', 'PROPN', 'PROPN', 'NOUN', 'PROPN', 'PUNCT'],
+        deps=['nsubj', 'nsubj', 'compound', 'ROOT', 'appos', 'punct'],
+        ents=['B-ORG', 'I-ORG', 'B-LOC', 'I-LOC', 'B-ORG', 'O']
+    )
+    assert SpaCyTokenizer.tokenize_document(doc, False, False) == 'gazprom_neft surgut_field rosneft'
+    assert tokenize_document_as_before(doc, False, False) != 'gazprom_neft surgut_field rosneft'
+
+
+@pytest.mark.parametrize('seed', range(50))
+def test_random_documents_are_tokenized_as_before(seed: int):
+    generator = random.Random(seed)
+    vocabulary = [('the', 'DET'), ('of', 'ADP'), ('it', 'PRON'), (',', 'PUNCT'), ('(', 'PUNCT'), ('\n', 'SPACE'),
+                  ('well', 'NOUN'), ('oil', 'NOUN'), ('Surgut', 'PROPN'), ('drilled', 'VERB'), ('deep', 'ADJ'),
+                  ('and', 'CCONJ'), ('-', 'PUNCT')]
+    n_tokens = generator.randint(1, 30)
+    words, pos = zip(*[generator.choice(vocabulary) for _ in range(n_tokens)])
+    deps = ['dep' for _ in range(n_tokens)]
+    deps[generator.randrange(n_tokens)] = 'ROOT'
+    ents = []
+    for _ in range(n_tokens):
+        if (len(ents) == 0) or (ents[-1] == 'O'):
+            ents.append(generator.choice(['O', 'B-ORG']))
+        else:
+            ents.append(generator.choice(['O', 'O', 'I-ORG']))
+    noun_chunks = sorted(set([tuple(sorted(generator.sample(range(n_tokens + 1), 2))) for _ in range(4)])) \
+        if n_tokens > 1 else []
+    doc = create_doc(list(words), list(pos), deps, ents, noun_chunks)
+    for select_noun_phrases in (False, True):
+        expected = SpaCyTokenizer.tokenize_document(doc, select_noun_phrases, False)
+        assert tokenize_document_as_before(doc, select_noun_phrases, False) == expected
+        assert tokenize_document_as_before(doc, select_noun_phrases, True) == expected
@@ -0,0 +1,130 @@
+import os
+import random
+from typing import List, Tuple
+
+import artm
+import numpy as np
+import pandas as pd
+import pytest
+
+from keyword_extraction.collection import BagOfWordsCollection
+from keyword_extraction.keyword_extraction import KeywordExtractor
+
+
+@pytest.fixture(scope='module')
+def collection_path(tmp_path_factory) -> str:
+    collection_path = str(tmp_path_factory.mktemp('collection'))
+    random_generator = random.Random(0)
+    topics = [['token_{0}_{1}'.format(topic_idx, token_idx) for token_idx in range(10)] for topic_idx in range(3)]
+    with BagOfWordsCollection(collection_path) as collection:
+        for _ in range(300):
+            terms = random_generator.choice(topics)
+            collection.add_document([random_generator.choice(terms) for _ in range(30)])
+        collection.create_batches(os.path.join(collection_path, 'batches'), 50)
+    dictionary = artm.Dictionary()
+    dictionary.gather(data_path=os.path.join(collection_path, 'batches'))
+    KeywordExtractor.save_dictionary(dictionary, os.path.join(collection_path, 'collection.dict'))
+    return collection_path
+
+
+def load_collection(collection_path: str) -> Tuple[artm.BatchVectorizer, artm.Dictionary]:
+    dictionary = artm.Dictionary()
+    dictionary.load(os.path.join(collection_path, 'collection.dict'))
+    return artm.BatchVectorizer(data_path=os.path.join(collection_path, 'batches'), data_format='batches'), dictionary
+
+
+def select_keywords_as_before(phi: pd.DataFrame, probability_threshold: float) -> List[str]:
+    all_words = phi.index
+    n_words = all_words.shape[0]
+    set_of_keywords = set()
+    for topic_name in phi.columns:
+        column = phi[topic_name]
+        set_of_keywords |= set(
+            map(
+                lambda keyword_and_probability: keyword_and_probability[0],
+                filter(
+                    lambda value: value[1] >= probability_threshold,
+                    map(lambda idx: (all_words[idx].replace('_', ' '), column[all_words[idx]]), range(n_words))
+                )
+            )
+        )
+    return sorted(list(set_of_keywords))
+
+
+def test_keywords_are_selected_as_before(tmp_path, collection_path):
+    batch_vectorizer, dictionary = load_collection(collection_path)
+    extractor = KeywordExtractor(os.path.join(str(tmp_path), 'tm'), 3, max_passes=5)
+    topic_model = extractor.fit_topic_model(batch_vectorizer, dictionary, 1, 1)
+    phi = topic_model.get_phi()
+    probability_thresholds = sorted(set(np.quantile(phi.values, [0.0, 0.25, 0.5, 0.9, 1.0]).tolist() +
+                                        phi.values[:, 0].tolist()[:3] + [0.01, 0.1]))
+    expected = [select_keywords_as_before(phi, cur_threshold) for cur_threshold in probability_thresholds]
+    assert 0 < len(expected[len(expected) // 2]) < phi.shape[0]
+    for topics_per_chunk in (None, 1, 2, 3, 5):
+        extractor = KeywordExtractor(os.path.join(str(tmp_path), 'tm'), 3, topics_per_chunk=topics_per_chunk)
+        all_words, max_probabilities = extractor.calculate_max_probabilities(topic_model)
+        assert extractor.select_keywords_by_thresholds(all_words, max_probabilities, probability_thresholds) == \
+            expected
+        for cur_threshold, cur_expected in zip(probability_thresholds, expected):
+            extractor.probability_threshold = cur_threshold
+            assert extractor.select_keywords_from_topic_model(topic_model) == cur_expected
+
+
+def test_keywords_with_tied_probabilities_are_selected_as_before():
+    random_generator = np.random.RandomState(0)
+    phi = pd.DataFrame(random_generator.randint(0, 5, size=(40, 4)) / 4.0,
+                       index=['token_{0}'.format(idx) if idx % 2 else 'token {0}'.format(idx + 1) for idx in range(40)],
+                       columns=['topic_{0}'.format(idx) for idx in range(4)])
+    probability_thresholds = [0.0, 0.25, 0.5, 0.75, 1.0, 1.5]
+    lists_of_keywords = KeywordExtractor.select_keywords_by_thresholds(phi.index.values, phi.values.max(axis=1),
+                                                                       probability_thresholds)
+    for cur_threshold, cur_keywords in zip(probability_thresholds, lists_of_keywords):
+        assert cur_keywords == select_keywords_as_before(phi, cur_threshold)
+        assert KeywordExtractor.select_keywords_by_probabilities(phi.index.values, phi.values.max(axis=1),
+                                                                 cur_threshold) == cur_keywords
+
+
+def test_training_is_stopped_early(tmp_path, collection_path):
+    batch_vectorizer, dictionary = load_collection(collection_path)
+    extractor = KeywordExtractor(os.path.join(str(tmp_path), 'tm'), 3, max_passes=10, tolerance=1e-3)
+    topic_model = extractor.fit_topic_model(batch_vectorizer, dictionary, 1, 1)
+    scores = topic_model.score_tracker['perplexity_score'].value
+    assert 2 < len(scores) < 10
+    assert abs(scores[-2] - scores[-1]) <= 1e-3 * abs(scores[-2])
+    assert all([abs(previous - cur) > 1e-3 * abs(previous) for previous, cur in zip(scores[:-2], scores[1:-1])])
+    extractor = KeywordExtractor(os.path.join(str(tmp_path), 'tm'), 3, max_passes=2, tolerance=0.0)
+    topic_model = extractor.fit_topic_model(batch_vectorizer, dictionary, 1, 1)
+    assert len(topic_model.score_tracker['perplexity_score'].value) == 2
+
+
+def test_single_restart_uses_fixed_seed(tmp_path, collection_path):
+    batch_vectorizer, dictionary = load_collection(collection_path)
+    extractor = KeywordExtractor(os.path.join(str(tmp_path), 'tm'), 3, max_passes=5)
+    topic_model = extractor.create_topic_model(os.path.join(str(tmp_path), 'tm'), batch_vectorizer, dictionary)
+    expected = extractor.fit_topic_model(batch_vectorizer, dictionary, 0)
+    assert np.array_equal(topic_model.get_phi().values, expected.get_phi().values)
+    assert topic_model.score_tracker['perplexity_score'].value == expected.score_tracker['perplexity_score'].value
+
+
+def test_best_restart_is_selected(tmp_path, collection_path):
+    n_restarts = 3
+    num_processors = max(1, (os.cpu_count() - 1) // min(n_restarts, os.cpu_count()))
+    extractor = KeywordExtractor(os.path.join(str(tmp_path), 'tm'), 3, max_passes=10, n_restarts=n_restarts)
+    scores = []
+    for seed in range(n_restarts):
+        scores.append(extractor.create_topic_model_from_files(
+            os.path.join(str(tmp_path), 'expected_{0}'.format(seed)), os.path.join(collection_path, 'batches'),
+            os.path.join(collection_path, 'collection.dict'), seed, num_processors
+        ))
+    assert len(set(scores)) == n_restarts
+    best_seed = int(np.argmin(scores))
+    _, dictionary = load_collection(collection_path)
+    topic_model_name = os.path.join(str(tmp_path), 'tm')
+    topic_model = extractor.create_topic_model_in_parallel(topic_model_name, os.path.join(collection_path, 'batches'),
+                                                           os.path.join(collection_path, 'collection.dict'),
+                                                           dictionary)
+    expected = extractor.load_topic_model(artm.ARTM(num_topics=3, dictionary=dictionary, cache_theta=False),
+                                          os.path.join(str(tmp_path), 'expected_{0}'.format(best_seed)))
+    assert np.allclose(topic_model.get_phi().values, expected.get_phi().values)
+    assert sorted(filter(lambda it: it.startswith('tm'), os.listdir(str(tmp_path)))) == ['tm.n_wt', 'tm.p_wt',
+                                                                                          'tm.scores']
@@ -0,0 +1,103 @@
+import codecs
+import json
+import os
+import random
+from typing import List
+
+import pytest
+import spacy
+from spacy.language import Language
+
+from keyword_extraction.training import NERTrainer
+
+
+COMPANIES = ['Rosneft', 'Gazprom Neft', 'Lukoil', 'Surgutneftegas']
+FIELDS = ['Samotlor', 'Priobskoye', 'Vankor']
+
+
+def generate_training_file(file_name: str, n_texts: int, random_generator: random.Random):
+    with codecs.open(file_name, mode='w', encoding='utf-8') as fp:
+        for _ in range(n_texts):
+            company = random_generator.choice(COMPANIES)
+            field = random_generator.choice(FIELDS)
+            text = '{0} has drilled a new well at the {1} field.'.format(company, field)
+            spans = [{'start': 0, 'end': len(company), 'label': 'ORG'},
+                     {'start': text.index(field), 'end': text.index(field) + len(field), 'label': 'LOC'}]
+            fp.write(json.dumps({'text': text, 'spans': spans}, ensure_ascii=False) + '\n')
+
+
+@pytest.fixture(scope='module')
+def training_files(tmp_path_factory) -> List[str]:
+    file_name = os.path.join(str(tmp_path_factory.mktemp('training_data')), 'train.jsonl')
+    generate_training_file(file_name, 40, random.Random(0))
+    return [file_name]
+
+
+def create_trainer(model_dir: str, n_epochs: int=2) -> NERTrainer:
+    return NERTrainer(model_dir, n_epochs=n_epochs, batch_start=4.0, batch_stop=32.0, batch_compound=1.5,
+                      shuffle_buffer=16, checkpoint_steps=2)
+
+
+def record_batches(monkeypatch, max_calls: int=-1) -> List[List[str]]:
+    batches = []
+    original_update = Language.update
+
+    def update(spacy_nlp, examples, *args, **kwargs):
+        if len(batches) == max_calls:
+            raise KeyboardInterrupt
+        batches.append([cur_example.reference.text for cur_example in examples])
+        return original_update(spacy_nlp, examples, *args, **kwargs)
+
+    monkeypatch.setattr(Language, 'update', update)
+    return batches
+
+
+def test_final_model_is_saved(tmp_path, training_files):
+    trainer = create_trainer(os.path.join(str(tmp_path), 'model'))
+    trainer.train(training_files, spacy.blank('en'))
+    assert os.path.isdir(trainer.last_model_name)
+    assert not os.path.isdir(trainer.best_model_name)
+    assert 'ner' in spacy.load(trainer.last_model_name).pipe_names
+    with codecs.open(trainer.state_name, mode='r', encoding='utf-8') as fp:
+        assert json.load(fp)['epoch'] == 2
+    assert sorted(os.listdir(trainer.model_dir)) == ['checkpoint', 'model-last']
+
+
+def test_interrupted_training_is_resumed(tmp_path, training_files, monkeypatch):
+    expected_batches = record_batches(monkeypatch)
+    create_trainer(os.path.join(str(tmp_path), 'expected')).train(training_files, spacy.blank('en'))
+    monkeypatch.undo()
+    assert [len(it) for it in expected_batches] == [4, 6, 9, 13, 8, 30, 10]
+    assert sum(expected_batches[:5], []) != sum(expected_batches[5:], [])
+    assert sorted(sum(expected_batches[:5], [])) == sorted(sum(expected_batches[5:], []))
+    trainer = create_trainer(os.path.join(str(tmp_path), 'model'))
+    interrupted_batches = record_batches(monkeypatch, max_calls=3)
+    with pytest.raises(KeyboardInterrupt):
+        trainer.train(training_files, spacy.blank('en'))
+    monkeypatch.undo()
+    assert interrupted_batches == expected_batches[:3]
+    assert not os.path.isdir(trainer.last_model_name)
+    assert trainer.load_state() == {'epoch': 0, 'step': 2, 'examples': 10, 'best_score': None}
+    resumed_batches = record_batches(monkeypatch)
+    trainer.train(training_files, spacy.blank('en'))
+    assert resumed_batches == expected_batches[2:]
+    assert os.path.isdir(trainer.last_model_name)
+
+
+def test_checkpoint_is_replaced_in_one_step(tmp_path):
+    trainer = create_trainer(os.path.join(str(tmp_path), 'model'))
+    spacy_nlp = spacy.blank('en')
+    assert trainer.load_state() is None
+    trainer.save_checkpoint(spacy_nlp, {'name': 'first'}, {'epoch': 0, 'step': 2, 'examples': 10,
+                                                           'best_score': None})
+    trainer.save_checkpoint(spacy_nlp, {'name': 'second'}, {'epoch': 1, 'step': 4, 'examples': 0,
+                                                            'best_score': None})
+    assert sorted(os.listdir(trainer.model_dir)) == ['checkpoint']
+    assert trainer.load_state()['step'] == 4
+    os.makedirs(trainer.checkpoint_dir + '.tmp')
+    os.replace(trainer.checkpoint_dir, trainer.checkpoint_dir + '.old')
+    assert trainer.load_state()['step'] == 4
+    assert sorted(os.listdir(trainer.model_dir)) == ['checkpoint']
+    os.makedirs(trainer.checkpoint_dir + '.old')
+    assert trainer.load_state()['step'] == 4
+    assert sorted(os.listdir(trainer.model_dir)) == ['checkpoint']